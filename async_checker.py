@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import socket
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from domain_checker import (IANA_WHOIS_SERVER, RETRYABLE_KINDS, WHOIS_PORT, WHOIS_QUERY_FORMATS, WHOIS_REFER_RE,
+                            WHOIS_SERVERS, CheckControl, ErrorKind, UnknownTldError, WhoisScheduler, backoff_delay,
+                            classify_partial, error_kind, error_status, exception_status, get_tld,
+                            parse_whois_response, referral_error)
+
+
+class AsyncDomainChecker:
+    """
+    Asyncio counterpart of DomainChecker that speaks the port-43 WHOIS protocol directly.
+    Lookups do not hold OS threads, so concurrency is bounded only by max_concurrency.
+    Pass server/port to send every query to a fixed WHOIS server (e.g. a local fake one).
+    """
+    def __init__(self, max_concurrency: int = 100, max_retries: int = 5, base_backoff: int = 2, jitter: bool = True,
+                 timeout: float = 10.0, server: Optional[str] = None, port: int = WHOIS_PORT,
+                 rate_limit: Optional[float] = None, max_per_server: Optional[int] = None, retry_delay: float = 0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.server = server
+        self.port = port
+        self.rate_limit = rate_limit
+        self.max_per_server = max_per_server
+        self.retry_delay = retry_delay  # Seconds before one final round for domains that still end in error
+        self.servers: Dict[str, str] = dict(WHOIS_SERVERS)
+        self.referred = set()  # Servers learned from IANA referrals rather than WHOIS_SERVERS
+        self.addresses: Dict[str, str] = {}
+        self.max_bytes = 65536
+
+    async def address_for(self, server: str) -> str:
+        address = self.addresses.get(server)
+        if address is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(server, self.port, type=socket.SOCK_STREAM)
+            address = self.addresses[server] = infos[0][4][0]
+        return address
+
+    async def query(self, server: str, query: str, early: bool = True) -> str:
+        """
+        Send a single WHOIS query and return the response text, stopping early
+        once the first chunks settle free/occupied (unless early is False).
+        """
+        try:
+            address = await self.address_for(server)
+        except socket.gaierror as e:
+            raise referral_error(e, server, self.referred)
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(address, self.port), self.timeout)
+        except OSError:
+            self.addresses.pop(server, None)
+            raise
+        try:
+            writer.write(f"{query}\r\n".encode('utf-8'))
+            await writer.drain()
+            data = b''
+            while len(data) < self.max_bytes:
+                chunk = await asyncio.wait_for(reader.read(4096), self.timeout)
+                if not chunk:
+                    break
+                data += chunk
+                if early and classify_partial(data.decode('utf-8', errors='replace')) is not None:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        if not data.strip():
+            raise ConnectionResetError(f'empty response from {server}')
+        return data.decode('utf-8', errors='replace')
+
+    async def whois_server_for(self, domain: str) -> str:
+        """
+        Return the WHOIS server for the domain's TLD, asking IANA once per unknown TLD.
+        """
+        if self.server:
+            return self.server
+        tld = get_tld(domain)
+        server = self.servers.get(tld)
+        if server is None:
+            match = WHOIS_REFER_RE.search(await self.query(IANA_WHOIS_SERVER, tld, early=False))
+            if not match:
+                raise UnknownTldError(f'no WHOIS server known for .{tld}')
+            server = self.servers[tld] = match.group(2)
+            self.referred.add(server)
+        return server
+
+    async def attempt_domain(self, domain: str) -> Tuple[str, bool]:
+        """
+        Make a single WHOIS attempt. Returns (status, retryable), where retryable is True
+        for the error kinds in RETRYABLE_KINDS: connection errors, timeouts and rate-limit replies.
+        """
+        try:
+            server = await self.whois_server_for(domain)
+            text = await self.query(server, WHOIS_QUERY_FORMATS.get(server, '{}').format(domain))
+            status = parse_whois_response(text)
+        except Exception as e:
+            status = exception_status(e)
+        return status, error_kind(status) in RETRYABLE_KINDS
+
+    async def check_domain(self, domain: str) -> Tuple[str, str]:
+        """
+        Check a single domain, retrying connection errors with non-blocking exponential backoff.
+        Returns (domain, status) where status is 'free', 'occupied', or 'error: <kind>: message'
+        """
+        for attempt in range(self.max_retries):
+            status, retryable = await self.attempt_domain(domain)
+            if not retryable or attempt == self.max_retries - 1:
+                return domain, status
+            await asyncio.sleep(backoff_delay(self.base_backoff, attempt, self.jitter))
+        return domain, error_status(ErrorKind.OTHER, 'max retries exceeded')
+
+    async def check_domains(self, domains: List[str], callback: Callable[[str, str], None] = None,
+                            control: Optional[CheckControl] = None) -> List[Tuple[str, str]]:
+        """
+        Check multiple domains with at most max_concurrency lookups in flight,
+        interleaved across WHOIS servers the same way as DomainChecker.check_domains.
+        Failed attempts wait out their backoff (and retry_delay) on a delay heap,
+        so a retrying domain never holds a worker or a per-server slot.
+        With a CheckControl, workers start no new lookups while it is paused and stop once it is cancelled,
+        returning the results gathered so far.
+        If callback is provided, it will be called for each result as it completes.
+        Returns list of (domain, status)
+        """
+        scheduler = WhoisScheduler(rate=self.rate_limit, max_per_server=self.max_per_server)
+        for domain in domains:
+            scheduler.add(domain)
+        results = []
+        released = asyncio.Event()
+        attempts: Dict[str, int] = {}
+        delayed = []  # Heap of (due, seq, domain)
+        final_round = set()
+        seq = 0
+        busy = 0
+
+        def retry_later(domain, delay):
+            nonlocal seq
+            seq += 1
+            heapq.heappush(delayed, (time.monotonic() + delay, seq, domain))
+
+        async def worker():
+            # Only max_concurrency worker coroutines ever exist, however long the list is
+            nonlocal busy
+            while scheduler.pending or delayed or busy:
+                if control is not None:
+                    if control.cancelled:
+                        return
+                    if control.paused:
+                        await asyncio.sleep(CheckControl.POLL_INTERVAL)
+                        continue
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    scheduler.add(heapq.heappop(delayed)[2])
+                item, wait = scheduler.next_ready()
+                if item is None:
+                    if delayed:
+                        until_due = delayed[0][0] - now
+                        wait = until_due if wait is None else min(wait, until_due)
+                    if control is not None:
+                        wait = CheckControl.POLL_INTERVAL if wait is None else min(wait, CheckControl.POLL_INTERVAL)
+                    released.clear()
+                    try:
+                        await asyncio.wait_for(released.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                domain, server = item
+                busy += 1
+                try:
+                    status, retryable = await self.attempt_domain(domain)
+                    attempt = attempts.pop(domain, 0) + 1
+                    if retryable and attempt < self.max_retries:
+                        attempts[domain] = attempt
+                        retry_later(domain, backoff_delay(self.base_backoff, attempt - 1, self.jitter))
+                        continue
+                    if domain in final_round:
+                        final_round.discard(domain)
+                    elif self.retry_delay > 0 and error_kind(status) in RETRYABLE_KINDS:
+                        final_round.add(domain)
+                        retry_later(domain, self.retry_delay)
+                        continue
+                finally:
+                    busy -= 1
+                    scheduler.release(server)
+                    released.set()
+                if callback:
+                    callback(domain, status)
+                results.append((domain, status))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, self.max_concurrency))))
+        return results
+
+    def run(self, domains: List[str], callback: Callable[[str, str], None] = None,
+            control: Optional[CheckControl] = None) -> List[Tuple[str, str]]:
+        """
+        Blocking entry point for synchronous callers such as cli.py.
+        """
+        return asyncio.run(self.check_domains(domains, callback=callback, control=control))
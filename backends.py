@@ -0,0 +1,316 @@
+import argparse
+import heapq
+import http.client
+import json
+import mmap
+import os
+import queue
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import SplitResult, quote, urlsplit
+
+from domain_checker import ErrorKind, LookupBackend, add_span, error_status, get_tld
+
+RDAP_BOOTSTRAP_URL = 'https://data.iana.org/rdap/dns.json'
+RDAP_HEADERS = {'Accept': 'application/rdap+json', 'Connection': 'keep-alive'}
+RDAP_RATE_LIMITED = error_status(ErrorKind.RATE_LIMITED, 'RDAP server asked us to slow down')
+
+# Names held in memory per sorted run while building a zone index
+ZONE_CHUNK_SIZE = 1_000_000
+
+
+def rdap_status(code: int) -> str:
+    """
+    Status for an RDAP domain query's HTTP status code; registries answer 404 for unregistered names.
+    """
+    if code == 200:
+        return 'occupied'
+    if code == 404:
+        return 'free'
+    if code == 429:
+        return RDAP_RATE_LIMITED
+    if code >= 500:
+        return error_status(ErrorKind.NETWORK, f'RDAP server returned HTTP {code}')
+    return error_status(ErrorKind.OTHER, f'unexpected RDAP HTTP status {code}')
+
+
+class RdapBackend(LookupBackend):
+    """
+    RDAP (HTTP/JSON) lookups, decided by status code alone, over keep-alive connections pooled per host.
+    servers maps TLDs to RDAP base URLs (e.g. {'com': 'https://rdap.verisign.com/com/v1'}); other TLDs
+    are found in the IANA bootstrap registry, fetched once on first use unless bootstrap_url is None.
+    TLDs without an RDAP service are left to the next backend of their route.
+    """
+    name = 'rdap'
+
+    def __init__(self, servers: Optional[Dict[str, str]] = None, bootstrap_url: Optional[str] = RDAP_BOOTSTRAP_URL,
+                 timeout: float = 10.0, pool_size: int = 8):
+        self.endpoints: Dict[str, SplitResult] = {tld.lower().lstrip('.'): urlsplit(url) for tld, url in (servers or {}).items()}
+        self.bootstrap_url = bootstrap_url
+        self.bootstrapped = bootstrap_url is None
+        self.timeout = timeout
+        self.pool_size = pool_size  # Idle connections kept per host
+        self.pools: Dict[Tuple[str, str, Optional[int]], queue.LifoQueue] = {}
+        self.lock = threading.Lock()
+
+    def load_bootstrap(self):
+        """
+        Add the TLDs of the IANA bootstrap registry that have no configured server.
+        A failed download is not retried; only configured servers are used then.
+        """
+        with self.lock:
+            if self.bootstrapped:
+                return
+            self.bootstrapped = True
+            try:
+                with urllib.request.urlopen(self.bootstrap_url, timeout=self.timeout) as response:
+                    registry = json.load(response)
+            except (OSError, ValueError):
+                return
+            for tlds, urls in registry.get('services', []):
+                url = next((url for url in urls if url.startswith('https://')), urls[0] if urls else None)
+                if url is None:
+                    continue
+                for tld in tlds:
+                    self.endpoints.setdefault(tld.lower(), urlsplit(url))
+
+    def endpoint_for(self, domain: str) -> Optional[SplitResult]:
+        tld = get_tld(domain)
+        if tld not in self.endpoints and not self.bootstrapped:
+            self.load_bootstrap()
+        return self.endpoints.get(tld)
+
+    def server_for(self, domain: str) -> Optional[str]:
+        endpoint = self.endpoint_for(domain)
+        return endpoint.hostname if endpoint is not None else None
+
+    def acquire(self, endpoint: SplitResult) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        An idle pooled connection to endpoint's host (reused=True), or a new unconnected one.
+        """
+        key = (endpoint.scheme, endpoint.hostname, endpoint.port)
+        pool = self.pools.get(key)
+        if pool is None:
+            with self.lock:
+                pool = self.pools.setdefault(key, queue.LifoQueue(maxsize=self.pool_size))
+        try:
+            return pool.get_nowait(), True
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if endpoint.scheme == 'https' else http.client.HTTPConnection
+            return cls(endpoint.hostname, endpoint.port, timeout=self.timeout), False
+
+    def release(self, endpoint: SplitResult, conn: http.client.HTTPConnection):
+        try:
+            self.pools[endpoint.scheme, endpoint.hostname, endpoint.port].put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> Optional[str]:
+        """
+        Return 'free', 'occupied' or an error status, or None when the TLD has no RDAP service.
+        With a trace dict, the 'server' (host), 'bytes' and 'connect'/'read' spans are recorded in it.
+        """
+        endpoint = self.endpoint_for(domain)
+        if endpoint is None:
+            return None
+        path = f"{endpoint.path.rstrip('/')}/domain/{quote(domain)}"
+        if trace is not None:
+            trace['server'] = endpoint.hostname
+        while True:
+            conn, reused = self.acquire(endpoint)
+            started = connected = time.monotonic()
+            body = b''
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                    connected = time.monotonic()
+                conn.request('GET', path, headers=RDAP_HEADERS)
+                response = conn.getresponse()
+                body = response.read()  # Drained so the connection can be reused
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and isinstance(e, (ConnectionError, http.client.BadStatusLine)):
+                    continue  # The server dropped the idle keep-alive connection; retry on a fresh one
+                if isinstance(e, http.client.HTTPException):
+                    raise ConnectionResetError(f'bad HTTP response from {endpoint.hostname}: {e!r}') from e
+                raise
+            finally:
+                if trace is not None:
+                    finished = time.monotonic()
+                    add_span(trace, 'connect', connected - started)
+                    add_span(trace, 'read', finished - connected)
+                    trace['bytes'] = trace.get('bytes', 0) + len(body)
+            if response.will_close:
+                conn.close()
+            else:
+                self.release(endpoint, conn)
+            return rdap_status(response.status)
+
+    def close(self):
+        for pool in self.pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class SortedNameFile:
+    """
+    A zone index: lowercase names, one per line in byte order (see build_zone_index),
+    searched in place by bisection over a memory map, so opening it costs no time or memory.
+    """
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __contains__(self, name: str) -> bool:
+        key = name.encode('ascii', errors='replace')
+        data = self.data
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b'\n', 0, mid) + 1
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = len(data)
+            line = data[start:end]
+            if line == key:
+                return True
+            if line < key:
+                lo = end + 1
+            else:
+                hi = start
+        return False
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+class ZoneBackend(LookupBackend):
+    """
+    Offline lookups in zone indexes, one per TLD ({'com': 'com.idx'}). A listed name is registered;
+    an unlisted one may still be registered without being delegated, so it goes on to the next
+    backend of its route instead of being reported free.
+    """
+    name = 'zone'
+    local = True
+
+    def __init__(self, indexes: Dict[str, str]):
+        self.indexes = {tld.lower().lstrip('.'): SortedNameFile(path) for tld, path in indexes.items()}
+
+    def server_for(self, domain: str) -> Optional[str]:
+        tld = get_tld(domain)
+        return f'zone:{tld}' if tld in self.indexes else None
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> Optional[str]:
+        index = self.indexes.get(get_tld(domain))
+        if index is not None and domain.lower().rstrip('.') in index:
+            return 'occupied'
+        return None
+
+    def close(self):
+        for index in self.indexes.values():
+            index.close()
+
+
+def build_backends(rdap: bool = False, rdap_servers: Optional[Dict[str, str]] = None,
+                   zone_indexes: Optional[Dict[str, str]] = None, timeout: float = 10.0) -> List[LookupBackend]:
+    """
+    Backends from plain, picklable settings (see sharded.build_checker), cheapest first:
+    zone indexes, then RDAP (bootstrapped from IANA with rdap, else only rdap_servers).
+    DomainChecker appends port-43 WHOIS itself.
+    """
+    backends = []
+    if zone_indexes:
+        backends.append(ZoneBackend(zone_indexes))
+    if rdap or rdap_servers:
+        backends.append(RdapBackend(rdap_servers, bootstrap_url=RDAP_BOOTSTRAP_URL if rdap else None, timeout=timeout))
+    return backends
+
+
+def iter_zone_names(lines: Iterable[str], tld: str) -> Iterator[str]:
+    """
+    Yield the names directly under tld that own records in a master-format zone file.
+    Plain lists with one domain per line work too.
+    """
+    tld = tld.lower().strip('.')
+    suffix = '.' + tld
+    origin = tld
+    for line in lines:
+        line = line.split(';', 1)[0]
+        if not line.strip() or line[0].isspace():
+            continue  # Blank, or another record of the previous owner
+        token = line.split(None, 1)[0].lower()
+        if token == '$origin':
+            origin = line.split()[1].lower().strip('.')
+            continue
+        if token.startswith('$') or token == '@':
+            continue
+        if token.endswith('.'):
+            name = token[:-1]
+        elif token.endswith(suffix):
+            name = token  # Already a full name, as in plain domain lists
+        else:
+            name = f'{token}.{origin}'
+        if name.endswith(suffix) and '.' not in name[:-len(suffix)]:
+            yield name
+
+
+def build_zone_index(zone_path: str, index_path: str, tld: str, chunk_size: int = ZONE_CHUNK_SIZE) -> int:
+    """
+    Write the sorted, deduplicated names under tld from a zone file to index_path for ZoneBackend,
+    and return how many there are. Runs of chunk_size names are sorted in memory and merged from
+    temporary files, so zones far larger than memory can be indexed.
+    """
+    runs = []
+    names = set()
+
+    def spill():
+        run = tempfile.TemporaryFile()
+        run.writelines(name + b'\n' for name in sorted(names))
+        run.seek(0)
+        runs.append(run)
+        names.clear()
+
+    with open(zone_path, 'r', encoding='ascii', errors='replace') as zone:
+        for name in iter_zone_names(zone, tld):
+            names.add(name.encode('ascii', errors='replace'))
+            if len(names) >= chunk_size:
+                spill()
+    if names:
+        spill()
+
+    count = 0
+    previous = None
+    partial = index_path + '.tmp'
+    with open(partial, 'wb') as out:
+        for line in heapq.merge(*runs):
+            if line != previous:
+                out.write(line)
+                count += 1
+                previous = line
+    for run in runs:
+        run.close()
+    os.replace(partial, index_path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a zone index for --zone-index from a zone file or domain list.")
+    parser.add_argument("zone_file", help="Master-format zone file, or one domain per line.")
+    parser.add_argument("tld", help="TLD the zone covers, e.g. com.")
+    parser.add_argument("index", help="Index file to write.")
+    args = parser.parse_args()
+    count = build_zone_index(args.zone_file, args.index, args.tld)
+    print(f"Indexed {count} .{args.tld.strip('.')} names in {args.index}")
+
+
+if __name__ == "__main__":
+    main()
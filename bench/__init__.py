@@ -0,0 +1,3 @@
+"""
+Benchmark harness: a fake WHOIS server and a runner that reports throughput as JSON.
+"""
@@ -0,0 +1,101 @@
+import asyncio
+import random
+import threading
+from collections import Counter
+from typing import Optional
+
+from domain_checker import TokenBucket
+
+RATE_LIMIT_REPLY = b"%% Query limit exceeded, try again later\r\n"
+
+
+class FakeWhoisServer:
+    """
+    Local port-43 WHOIS stand-in for benchmarks, run on a background event loop.
+    Every query waits latency (+ up to latency_jitter) seconds, then a reset_rate share of
+    connections is reset (error 54 on Mac, 104 on Linux), queries above rate_limit per second
+    get a limit-exceeded reply, and the rest get a record padded to response_size bytes:
+    registered for names containing 'taken', "No match" otherwise.
+    stats counts queries, resets, rate_limited and answered.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.02, latency_jitter: float = 0.0,
+                 reset_rate: float = 0.0, rate_limit: Optional[float] = None, response_size: int = 512,
+                 seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.reset_rate = reset_rate
+        self.bucket = TokenBucket(rate_limit, burst=max(1, int(rate_limit or 1)))
+        self.response_size = response_size
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def response_for(self, query: str) -> bytes:
+        if 'taken' in query:
+            head = (f"Domain Name: {query.upper()}\r\nRegistry Domain ID: 1_BENCH\r\n"
+                    f"Registrar: Bench Registrar\r\nCreation Date: 2000-01-01T00:00:00Z\r\n")
+        else:
+            head = f'No match for "{query.upper()}".\r\n'
+        data = head.encode('ascii')
+        filler = b"% This line pads the response to the configured size.\r\n"
+        if len(data) < self.response_size:
+            data += (filler * (self.response_size // len(filler) + 1))[:self.response_size - len(data)]
+        return data
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            query = (await reader.readline()).decode('utf-8', errors='replace').strip()
+            self.stats['queries'] += 1
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.latency_jitter))
+            if self.random.random() < self.reset_rate:
+                self.stats['resets'] += 1
+                writer.transport.abort()  # Closes with RST, like an overloaded registry
+                return
+            if self.bucket.try_acquire() > 0:
+                self.stats['rate_limited'] += 1
+                writer.write(RATE_LIMIT_REPLY)
+            else:
+                self.stats['answered'] += 1
+                writer.write(self.response_for(query))
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+    def start(self) -> 'FakeWhoisServer':
+        """
+        Start serving in a daemon thread and return once the port is bound (self.port is then set).
+        """
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle, self.host, self.port, backlog=4096))
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
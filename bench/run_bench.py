@@ -0,0 +1,227 @@
+"""
+Throughput benchmark for the checking engines against a local FakeWhoisServer.
+
+Run from the repository root:
+
+    python -m bench.run_bench --sizes 1000,10000 --threads 10,50 --reset-rate 0.01 -o bench.json
+
+Every (engine, threads, size) scenario runs in a fresh process, so peak RSS is per scenario,
+and gets its own fake server. Results are printed (or written) as JSON; with --baseline the
+run fails when throughput drops more than --tolerance below a previous report.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import queue
+import sys
+import time
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from async_checker import AsyncDomainChecker
+from bench.fake_whois import FakeWhoisServer
+from domain_checker import DomainChecker, is_error
+
+ENGINES = ('threads', 'queue', 'asyncio')
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list, 0.0 for an empty one.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def make_domains(size: int, occupied_ratio: float) -> List[str]:
+    occupied = int(size * occupied_ratio)
+    return [f"bench{i}-{'taken' if i < occupied else 'free'}.com" for i in range(size)]
+
+
+def run_engine(engine: str, threads: int, domains: List[str], port: int, options: dict) -> Dict[str, object]:
+    """
+    Check domains with one engine, pointed at the fake server, and return its measurements.
+    Latency is measured per WHOIS attempt, so retries add samples rather than inflating one.
+    """
+    latencies = []
+    settings = dict(max_retries=options['retries'], base_backoff=options['backoff'], jitter=options['jitter'],
+                    retry_delay=options['retry_delay'])
+
+    if engine == 'asyncio':
+        checker = AsyncDomainChecker(max_concurrency=threads, server='127.0.0.1', port=port,
+                                     timeout=options['timeout'], **settings)
+        attempt_domain = checker.attempt_domain
+
+        async def timed_attempt(domain):
+            start = time.perf_counter()
+            try:
+                return await attempt_domain(domain)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        checker.attempt_domain = timed_attempt
+        started = time.perf_counter()
+        results = asyncio.run(checker.check_domains(domains))
+    else:
+        checker = DomainChecker(max_threads=threads, timeout=options['timeout'], **settings)
+        checker.client.server, checker.client.port = '127.0.0.1', port
+        lookup_once = checker.lookup_once
+
+        def timed_lookup(domain, *args):
+            start = time.perf_counter()
+            try:
+                return lookup_once(domain, *args)
+            finally:
+                latencies.append(time.perf_counter() - start)  # list.append is atomic across threads
+
+        checker.lookup_once = timed_lookup
+        started = time.perf_counter()
+        if engine == 'threads':
+            results = checker.check_domains(domains)
+        else:
+            result_queue = queue.Queue()
+            checker.check_domains_async(domains, result_queue)
+            results = [result_queue.get_nowait() for _ in range(result_queue.qsize())]
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(1 for _, status in results if is_error(status))
+    return {
+        'engine': engine,
+        'threads': threads,
+        'domains': len(domains),
+        'results': len(results),
+        'seconds': round(elapsed, 3),
+        'domains_per_sec': round(len(results) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 2)
+                       for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))},
+        'attempts': len(latencies),
+        'retries': len(latencies) - len(results),
+        'errors': errors,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _scenario_main(out, engine, threads, domains, port, options):
+    try:
+        out.put(run_engine(engine, threads, domains, port, options))
+    except BaseException as e:
+        out.put({'engine': engine, 'threads': threads, 'domains': len(domains), 'error': f'{type(e).__name__}: {e}'})
+        raise
+
+
+def run_scenario(engine: str, threads: int, size: int, options: dict) -> Dict[str, object]:
+    """
+    Run one scenario in a fresh process against its own fake server and add the server's counters.
+    """
+    server = FakeWhoisServer(latency=options['latency'], latency_jitter=options['latency_jitter'],
+                             reset_rate=options['reset_rate'], rate_limit=options['rate_limit'],
+                             response_size=options['response_size'], seed=options['seed'])
+    ctx = multiprocessing.get_context('spawn')  # A clean interpreter, so peak RSS is this scenario's alone
+    out = ctx.Queue()
+    with server:
+        process = ctx.Process(target=_scenario_main, args=(out, engine, threads, make_domains(size, options['occupied_ratio']),
+                                                            server.port, options))
+        process.start()
+        result = out.get()
+        process.join()
+    result['server'] = dict(server.stats)
+    return result
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """
+    Return a message for every scenario whose domains/sec fell more than tolerance below the baseline.
+    """
+    previous = {(r['engine'], r['threads'], r['domains']): r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result['engine'], result['threads'], result['domains']))
+        if before is None or 'error' in result:
+            continue
+        if result['domains_per_sec'] < before['domains_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['engine']} threads={result['threads']} domains={result['domains']}: "
+                               f"{before['domains_per_sec']} -> {result['domains_per_sec']} domains/sec")
+    return regressions
+
+
+def csv_ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the domain checking engines against a local fake WHOIS server.")
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help="Comma-separated engines: threads (check_domains), queue (check_domains_async), asyncio (AsyncDomainChecker)")
+    parser.add_argument('--threads', type=csv_ints, default=[10, 50], help="Comma-separated thread counts / asyncio concurrency (default: 10,50)")
+    parser.add_argument('--sizes', type=csv_ints, default=[1000], help="Comma-separated domain list sizes (default: 1000)")
+    parser.add_argument('--occupied-ratio', type=float, default=0.5, help="Share of domains the server reports as registered (default: 0.5)")
+    parser.add_argument('--latency', type=float, default=0.02, help="Server latency per query in seconds (default: 0.02)")
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help="Extra random latency of up to this many seconds (default: 0)")
+    parser.add_argument('--reset-rate', type=float, default=0.0, help="Share of connections reset by the server (default: 0)")
+    parser.add_argument('--rate-limit', type=float, default=None, help="Queries per second the server answers before replying 'limit exceeded'")
+    parser.add_argument('--response-size', type=int, default=512, help="Response size in bytes (default: 512)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the server's latency jitter and resets")
+    parser.add_argument('--retries', type=int, default=5, help="Maximum attempts per domain (default: 5)")
+    parser.add_argument('--backoff', type=float, default=2, help="Base backoff time in seconds (default: 2)")
+    parser.add_argument('--no-jitter', action='store_true', help="Disable jitter in backoff")
+    parser.add_argument('--retry-delay', type=float, default=0, help="Delay before a final round for errors, 0 to disable (default: 0)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Client read timeout in seconds (default: 10)")
+    parser.add_argument('-o', '--output', help="Write the JSON report to this file instead of stdout")
+    parser.add_argument('--baseline', help="Previous JSON report to compare domains/sec against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed throughput drop against --baseline (default: 0.1)")
+    args = parser.parse_args()
+
+    engines = [engine for engine in args.engines.split(',') if engine]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+
+    options = dict(latency=args.latency, latency_jitter=args.latency_jitter, reset_rate=args.reset_rate,
+                   rate_limit=args.rate_limit, response_size=args.response_size, seed=args.seed,
+                   occupied_ratio=args.occupied_ratio, retries=args.retries, backoff=args.backoff,
+                   jitter=not args.no_jitter, retry_delay=args.retry_delay, timeout=args.timeout)
+    results = []
+    for size in args.sizes:
+        for threads in args.threads:
+            for engine in engines:
+                result = run_scenario(engine, threads, size, options)
+                results.append(result)
+                summary = result.get('error') or f"{result['domains_per_sec']} domains/sec, p99 {result['latency_ms']['p99']} ms"
+                print(f"{engine:8} threads={threads:<5} domains={size:<8} {summary}", file=sys.stderr)
+
+    report = {'config': options, 'results': results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    failed = [r for r in results if 'error' in r]
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        failed += regressions
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import re
+from collections import Counter
+from typing import Container, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from domain_input import LABEL_RE
+
+# Characters allowed as literals in patterns, and inside [...] classes
+LDH = frozenset('abcdefghijklmnopqrstuvwxyz0123456789-')
+REPEAT_RE = re.compile(r'\{(\d+)(?:,(\d+))?\}')
+
+
+class Choice:
+    """
+    One position taking each of a fixed set of strings: a literal character or a [...] class.
+    """
+    def __init__(self, values: Sequence[str]):
+        self.values = tuple(values)
+
+    def iterate(self) -> Iterator[str]:
+        return iter(self.values)
+
+    def size(self) -> int:
+        return len(self.values)
+
+
+class Wordlist:
+    """
+    A <name> slot: every valid label in a file, one per line. The file is re-read on each pass
+    instead of being held in memory.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'r', encoding='utf-8'):
+            pass  # Fail while parsing the pattern, not halfway through a run
+
+    def iterate(self) -> Iterator[str]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                word = line.strip().lower()
+                if word and LABEL_RE.match(word):
+                    yield word
+
+    def size(self) -> int:
+        return sum(1 for _ in self.iterate())
+
+
+class Repeat:
+    """
+    An atom repeated minimum to maximum times, shortest strings first.
+    """
+    def __init__(self, atom, minimum: int, maximum: int):
+        self.atom = atom
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def iterate(self) -> Iterator[str]:
+        for count in range(self.minimum, self.maximum + 1):
+            yield from expand([self.atom] * count)
+
+    def size(self) -> int:
+        size = self.atom.size()
+        return sum(size ** count for count in range(self.minimum, self.maximum + 1))
+
+
+def expand(atoms: list, prefix: str = '') -> Iterator[str]:
+    """
+    Lazily yield the cross product of atoms as strings, varying the last atom fastest.
+    """
+    if not atoms:
+        yield prefix
+        return
+    for part in atoms[0].iterate():
+        yield from expand(atoms[1:], prefix + part)
+
+
+def parse_class(body: str, pattern: str) -> List[str]:
+    chars = []
+    i = 0
+    while i < len(body):
+        if i + 2 < len(body) and body[i + 1] == '-':
+            start, end = body[i], body[i + 2]
+            if start > end:
+                raise ValueError(f"bad range {start}-{end} in pattern {pattern!r}")
+            chars.extend(chr(c) for c in range(ord(start), ord(end) + 1))
+            i += 3
+        else:
+            chars.append(body[i])
+            i += 1
+    bad = set(chars) - LDH
+    if bad or not chars:
+        raise ValueError(f"class [{body}] in pattern {pattern!r} must hold letters, digits or '-'")
+    return sorted(set(chars))
+
+
+def parse_pattern(pattern: str, wordlists: Optional[Dict[str, str]] = None) -> list:
+    """
+    Parse a label pattern into atoms for expand(). Syntax:
+    letters, digits and '-' stand for themselves; [a-z0-9] is one character from a class;
+    <name> is each word of the wordlist called name; {n} or {m,n} repeats the preceding item,
+    e.g. 'get<word>', '[a-z]{3}', '<adjective>-<noun>', '[a-z]{2,4}[0-9]'.
+    """
+    wordlists = wordlists or {}
+    atoms = []
+    text = pattern.lower()
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '[':
+            end = text.find(']', i)
+            if end == -1:
+                raise ValueError(f"unclosed [ in pattern {pattern!r}")
+            atoms.append(Choice(parse_class(text[i + 1:end], pattern)))
+            i = end + 1
+        elif char == '<':
+            end = text.find('>', i)
+            if end == -1:
+                raise ValueError(f"unclosed < in pattern {pattern!r}")
+            name = text[i + 1:end]
+            if name not in wordlists:
+                raise ValueError(f"pattern {pattern!r} uses <{name}> but no wordlist is named {name!r}")
+            atoms.append(Wordlist(wordlists[name]))
+            i = end + 1
+        elif char == '{':
+            match = REPEAT_RE.match(text, i)
+            if match is None or not atoms:
+                raise ValueError(f"bad repeat at position {i} of pattern {pattern!r}")
+            minimum = int(match.group(1))
+            maximum = int(match.group(2)) if match.group(2) is not None else minimum
+            if maximum < minimum:
+                raise ValueError(f"bad repeat {match.group(0)} in pattern {pattern!r}")
+            atoms[-1] = Repeat(atoms[-1], minimum, maximum)
+            i = match.end()
+        elif char in LDH:
+            atoms.append(Choice(char))
+            i += 1
+        else:
+            raise ValueError(f"unexpected {char!r} in pattern {pattern!r}")
+    if not atoms:
+        raise ValueError("empty pattern")
+    return atoms
+
+
+class CandidateGenerator:
+    """
+    Lazy source of candidate domains: every label of each pattern (see parse_pattern) under every TLD,
+    filtered by label length and include/exclude regexes. Nothing is materialized, so search spaces
+    far larger than memory stream straight into DomainChecker.iter_check_domains.
+    Labels that are not valid hostnames are always dropped. With known (e.g. a ResultCache),
+    names it already holds are skipped. Names repeated across overlapping patterns are not
+    deduplicated. stats counts accepted, filtered and known names.
+    """
+    def __init__(self, patterns: Iterable[str], tlds: Iterable[str] = ('com',), wordlists: Optional[Dict[str, str]] = None,
+                 min_length: int = 1, max_length: int = 63, include: Iterable[str] = (), exclude: Iterable[str] = (),
+                 known: Optional[Container[str]] = None):
+        self.patterns = [parse_pattern(pattern, wordlists) for pattern in patterns]
+        self.tlds = [tld.lower().strip().strip('.') for tld in tlds if tld.strip()]
+        if not self.tlds:
+            raise ValueError("no TLDs given")
+        self.min_length = min_length
+        self.max_length = max_length
+        self.include = [re.compile(regex) for regex in include]
+        self.exclude = [re.compile(regex) for regex in exclude]
+        self.known = known
+        self.stats = Counter()
+
+    def accepts(self, label: str) -> bool:
+        if not self.min_length <= len(label) <= self.max_length or not LABEL_RE.match(label):
+            return False
+        if label[2:4] == '--' and not label.startswith('xn--'):
+            return False  # Reserved for encoded labels; registries refuse them
+        if not all(regex.search(label) for regex in self.include):
+            return False
+        return not any(regex.search(label) for regex in self.exclude)
+
+    def estimate(self) -> int:
+        """
+        Number of names before filters. Wordlists are read once to count them.
+        """
+        labels = 0
+        for atoms in self.patterns:
+            size = 1
+            for atom in atoms:
+                size *= atom.size()
+            labels += size
+        return labels * len(self.tlds)
+
+    def iter_domains(self) -> Iterator[str]:
+        for atoms in self.patterns:
+            for label in expand(atoms):
+                if not self.accepts(label):
+                    self.stats['filtered'] += len(self.tlds)
+                    continue
+                for tld in self.tlds:
+                    domain = f'{label}.{tld}'
+                    if self.known is not None and domain in self.known:
+                        self.stats['known'] += 1
+                        continue
+                    self.stats['accepted'] += 1
+                    yield domain
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_domains()
+
+    def summary(self) -> str:
+        return (f"{self.stats['accepted']} generated, {self.stats['filtered']} filtered out, "
+                f"{self.stats['known']} already cached skipped")
@@ -0,0 +1,77 @@
+import os
+import time
+from typing import Dict
+
+DEFAULT_CHECKPOINT_PATH = 'checkpoint.journal'
+
+
+def load_journal(path: str) -> Dict[str, str]:
+    """
+    Read a checkpoint journal (or saved GUI session) into an ordered {domain: status} dict.
+    A torn last line from a crash is ignored; later entries for a domain win.
+    Returns an empty dict if the file does not exist.
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            domain, sep, status = line.rstrip('\n').partition('\t')
+            if sep:
+                entries[domain] = status
+    return entries
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of finished (domain, status) results.
+    Each record is flushed to the OS immediately and fsynced at most every fsync_interval seconds,
+    so a crash or kill loses at most that much work.
+    With resume=True the existing journal is kept (minus any torn last line) and appended to.
+    """
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, resume: bool = False, fsync_interval: float = 5.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        if resume and os.path.exists(path):
+            self._truncate_torn_tail()
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        self.last_sync = time.monotonic()
+
+    def _truncate_torn_tail(self):
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def record(self, domain: str, status: str):
+        self.file.write(f"{domain}\t{status}\n")
+        self.file.flush()
+        if time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_session(path: str, results: Dict[str, str]):
+    """
+    Write a full {domain: status} snapshot (pending domains included) in journal format.
+    """
+    with CheckpointJournal(path, fsync_interval=float('inf')) as journal:
+        for domain, status in results.items():
+            journal.file.write(f"{domain}\t{status}\n")
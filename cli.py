@@ -1,77 +1,368 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import os
+import signal
 import sys
-from domain_checker import DomainChecker
+import itertools
+import re
 import time
+from collections import Counter
+from sharded import build_checker, iter_check_sharded
+from domain_input import DomainNormalizer, EXACT_DEDUPE_LIMIT
+from checkpoint import CheckpointJournal, load_journal, DEFAULT_CHECKPOINT_PATH
+from metrics import MetricsCollector, ObserverGroup, StatsReporter, serve_metrics
+from result_cache import ResultCache, DEFAULT_CACHE_PATH, DEFAULT_TTL_OCCUPIED, DEFAULT_TTL_FREE, DEFAULT_TTL_ERROR, DEFAULT_MAX_ENTRIES
+
+# Modules loaded only by the features that need them, for --self-test-startup
+DEFERRED_IMPORTS = (
+    ('output', '--format jsonl/csv'),
+    ('candidates', '--generate'),
+    ('verify', '--verify-free'),
+    ('dns_prefilter', '--dns-prefilter'),
+    ('backends', '--rdap, --zone-index'),
+    ('service', '--serve'),
+    ('multiprocessing', '--workers'),
+    ('concurrent.futures', 'first check'),
+    ('sqlite3', 'result cache'),
+    ('whois', '--python-whois'),
+)
+
+def startup_report(runs=5):
+    """
+    Print how long the interpreter, the CLI and each deferred import take to start, as the best of
+    runs fresh interpreters, so changes that slow down short scripted calls are easy to spot.
+    """
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def best(command):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = subprocess.run(command, cwd=here, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            timings.append(time.perf_counter() - started)
+        return result, min(timings)
+
+    print(f"Startup times, best of {runs} fresh interpreters:")
+    interpreter = best([sys.executable, '-c', 'pass'])[1]
+    print(f"  {'python -c pass':44} {interpreter * 1000:7.1f} ms")
+    for label, args in (('cli.py --help', ['--help']), ('cli.py --generate example --list-candidates', ['--generate', 'example', '--list-candidates'])):
+        elapsed = best([sys.executable, os.path.join(here, 'cli.py')] + args)[1]
+        print(f"  {label:44} {elapsed * 1000:7.1f} ms  (+{(elapsed - interpreter) * 1000:.1f} ms over the interpreter)")
+    print("Deferred imports, paid only by the features that use them:")
+    probe = "import sys, time; import cli; t = time.perf_counter(); __import__(sys.argv[1]); print(time.perf_counter() - t)"
+    for module, feature in DEFERRED_IMPORTS:
+        result, _ = best([sys.executable, '-c', probe, module])
+        cost = f"{float(result.stdout) * 1000:7.1f} ms" if result.returncode == 0 else "    not installed"
+        print(f"  {module:20} {feature:23} {cost}")
+
+def parse_pairs(parser, flag, values):
+    """
+    Turn repeated KEY=VALUE options (TLD=URL, NAME=PATH, ...) into a dict, exiting with a usage error on malformed ones.
+    """
+    pairs = {}
+    for value in values or ():
+        key, sep, rest = value.partition('=')
+        if not sep or not key or not rest:
+            parser.error(f"{flag} expects KEY=VALUE, got {value!r}")
+        pairs[key.lower().strip('.')] = rest
+    return pairs
+
+def serve(args, checker_kwargs, cache_kwargs, dns_kwargs, backend_kwargs, collector):
+    """
+    Run the HTTP/JSON service until interrupted. Every client shares one warm checker,
+    so its cache, scheduler and per-server rate limits span all requests.
+    """
+    from service import CheckService, make_server
+    collector = collector or MetricsCollector()  # /metrics is always available in server mode
+    checker = build_checker(dict(checker_kwargs, observer=collector), cache_kwargs, dns_kwargs, backend_kwargs)
+    service = CheckService(checker, window=args.window).start()
+    host, _, port = (args.serve or '').rpartition(':')
+    host, port = host or '127.0.0.1', int(port or 8043)
+    server = make_server(service, host, port, unix_socket=args.unix_socket)
+    print(f"Serving on {args.unix_socket or f'http://{host}:{port}'} (Ctrl+C to stop)")
+
+    def stop_on_sigterm(signum, frame):
+        raise KeyboardInterrupt  # Shut down cleanly under service managers too, so the cache is flushed
+
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if checker.cache is not None:
+            checker.cache.close()
 
 def main():
     parser = argparse.ArgumentParser(description="Check domain availability using whois.")
     parser.add_argument("-i", "--input", help="Path to the file with the list of domains. If not provided, read from stdin.")
+    parser.add_argument("--generate", action="append", default=None, metavar="PATTERN", help="Check generated names instead of reading a list, e.g. '[a-z]{4}' or 'get<word>' (repeatable; see README).")
+    parser.add_argument("--wordlist", action="append", default=None, metavar="NAME=PATH", help="Wordlist used as <NAME> in --generate patterns, one word per line (repeatable).")
+    parser.add_argument("--tlds", default="com", help="Comma-separated TLDs for --generate (default: com).")
+    parser.add_argument("--min-length", type=int, default=1, help="Shortest generated label (default: 1).")
+    parser.add_argument("--max-length", type=int, default=63, help="Longest generated label (default: 63).")
+    parser.add_argument("--include", action="append", default=[], metavar="REGEX", help="Keep only generated labels matching REGEX (repeatable; all must match).")
+    parser.add_argument("--exclude", action="append", default=[], metavar="REGEX", help="Drop generated labels matching REGEX (repeatable).")
+    parser.add_argument("--skip-known", action="store_true", help="Leave out generated names that already have a cached result instead of reporting them.")
+    parser.add_argument("--list-candidates", action="store_true", help="Print the names --generate would check, then exit.")
     parser.add_argument("-o", "--output-free", default="free_domains.txt", help="File to save free domains.")
     parser.add_argument("-b", "--output-occupied", default="occupied_domains.txt", help="File to save occupied domains.")
     parser.add_argument("-e", "--output-errors", default="errors.txt", help="File to save errors.")
     parser.add_argument("-a", "--output-all", default="all_domains.txt", help="File to save all domains with statuses.")
+    parser.add_argument("--format", choices=["text", "jsonl", "csv"], default="text", help="text writes the four files above; jsonl and csv stream one row per domain (domain, status, error_class, server, attempts, latency, checked_at) instead.")
+    parser.add_argument("--results-file", default=None, help="File for --format jsonl/csv rows (default: stdout when piped, otherwise all_domains.jsonl or all_domains.csv).")
     parser.add_argument("-t", "--threads", type=int, default=10, help="Number of threads to use.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of worker processes, each with its own threads (default: 1).")
+    parser.add_argument("--shard-by", choices=["server", "hash"], default="server", help="Split work between processes by WHOIS server (no shared servers) or by domain hash (per-server limits are divided).")
     parser.add_argument("-r", "--retries", type=int, default=5, help="Max retries for connection errors.")
     parser.add_argument("--backoff", type=int, default=2, help="Base backoff for exponential retry (seconds).")
     parser.add_argument("--no-jitter", action="store_false", dest="jitter", help="Disable jitter in backoff.")
-    parser.add_argument("--auto-retry-delay", type=int, default=60, help="Delay in seconds before auto-retrying errors (0 to disable).")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Read timeout in seconds for each WHOIS query (connect timeout is at most 5s).")
+    parser.add_argument("--python-whois", action="store_true", help="Use the python-whois library instead of the built-in WHOIS client.")
+    parser.add_argument("--rate", type=float, default=None, help="Max queries per second to each WHOIS server (default: unlimited).")
+    parser.add_argument("--per-server", type=int, default=None, help="Max concurrent lookups per WHOIS server (default: unlimited).")
+    parser.add_argument("--adaptive", choices=["global", "server"], default=None, help="Tune concurrency automatically (AIMD), globally or per WHOIS server; --threads and --per-server become ceilings.")
+    parser.add_argument("--auto-retry-delay", type=int, default=60, help="Delay in seconds before one more round for domains that still end in error (0 to disable).")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite file caching results between runs.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the result cache.")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-query every domain and overwrite cached results.")
+    parser.add_argument("--cache-ttl-occupied", type=float, default=DEFAULT_TTL_OCCUPIED, help="Seconds to trust a cached 'occupied' result.")
+    parser.add_argument("--cache-ttl-free", type=float, default=DEFAULT_TTL_FREE, help="Seconds to trust a cached 'free' result.")
+    parser.add_argument("--cache-ttl-error", type=float, default=DEFAULT_TTL_ERROR, help="Seconds to trust a cached error (0 to never cache errors).")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Max cached domains before least recently used ones are evicted.")
+    parser.add_argument("--dns-prefilter", action="store_true", help="Mark domains with NS records as occupied via DNS before querying WHOIS.")
+    parser.add_argument("--dns-resolver", default="8.8.8.8", help="Resolver for --dns-prefilter, as host or host:port.")
+    parser.add_argument("--dns-timeout", type=float, default=2.0, help="Seconds to wait for each DNS answer.")
+    parser.add_argument("--dns-concurrency", type=int, default=200, help="Max DNS queries in flight.")
+    parser.add_argument("--rdap", action="store_true", help="Check TLDs that have an RDAP service (per the IANA bootstrap registry) over RDAP instead of port-43 WHOIS.")
+    parser.add_argument("--rdap-server", action="append", default=None, metavar="TLD=URL", help="RDAP base URL for a TLD, e.g. com=https://rdap.verisign.com/com/v1 (repeatable; without --rdap only these TLDs use RDAP).")
+    parser.add_argument("--zone-index", action="append", default=None, metavar="TLD=PATH", help="Sorted zone index built with backends.py; names listed in it are reported occupied without a lookup (repeatable).")
+    parser.add_argument("--route", action="append", default=None, metavar="TLD=BACKENDS", help="Backends to try for a TLD, in order, e.g. com=zone,rdap (names: zone, rdap, whois; repeatable). Default: every available backend, cheapest first.")
+    parser.add_argument("--verify-free", action="store_true", help="Re-check every free result after a delay, via another backend when the TLD has one, and keep it free only on the registry's exact 'not found' reply.")
+    parser.add_argument("--verify-delay", type=float, default=30.0, help="Seconds between a free result and its re-check (default: 30).")
+    parser.add_argument("--verify-threads", type=int, default=2, help="Max concurrent re-checks of free results (default: 2).")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Journal of finished domains used by --resume.")
+    parser.add_argument("--resume", action="store_true", help="Skip domains already recorded in the checkpoint journal and keep their results.")
+    parser.add_argument("--no-dedupe", action="store_false", dest="dedupe", help="Check repeated domains again instead of dropping them.")
+    parser.add_argument("--bloom", type=int, default=None, metavar="CAPACITY", help="Deduplicate with a fixed-memory Bloom filter sized for CAPACITY domains from the start. By default an exact set is used for the first 1,000,000 domains (about 100 MB), then a Bloom filter for 100,000,000 (about 180 MB). Rare false positives drop unique domains.")
+    parser.add_argument("--window", type=int, default=None, help="Max domains buffered between input and lookups (default: max(1000, 10 x threads)).")
+    parser.add_argument("--stats-interval", type=float, default=None, metavar="SECONDS", help="Print a stats line (rate, retries, phase timings, slowest server) to stderr every SECONDS.")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--serve", default=None, metavar="[HOST:]PORT", help="Run as a long-lived HTTP/JSON service instead of checking a file (see README); --workers is ignored.")
+    parser.add_argument("--unix-socket", default=None, metavar="PATH", help="Like --serve, but listen on a Unix socket.")
     parser.add_argument("--verbose", action="store_true", help="Print verbose output.")
+    parser.add_argument("--self-test-startup", action="store_true", help="Report interpreter, CLI and per-feature import times, then exit.")
     args = parser.parse_args()
 
-    # Read domains
-    if args.input:
-        with open(args.input, 'r') as f:
-            domains = [line.strip() for line in f if line.strip()]
+    if args.self_test_startup:
+        startup_report()
+        return
+
+    structured = args.format != "text"
+    # When rows go to a pipe, progress messages move to stderr so the stream stays machine-readable
+    to_stdout = structured and args.results_file is None and not sys.stdout.isatty()
+    info_stream = sys.stderr if to_stdout else sys.stdout
+
+    def info(message):
+        print(message, file=info_stream)
+
+    cache_kwargs = None
+    if not args.no_cache:
+        cache_kwargs = dict(path=args.cache, ttl_occupied=args.cache_ttl_occupied, ttl_free=args.cache_ttl_free,
+                            ttl_error=args.cache_ttl_error, max_entries=args.cache_size)
+
+    dns_kwargs = None
+    if args.dns_prefilter:
+        host, _, port = args.dns_resolver.partition(':')
+        dns_kwargs = dict(resolver=host, port=int(port or 53), timeout=args.dns_timeout,
+                          max_concurrency=args.dns_concurrency)
+
+    checker_kwargs = dict(max_threads=args.threads, max_retries=args.retries, base_backoff=args.backoff, jitter=args.jitter,
+                          rate_limit=args.rate, max_per_server=args.per_server, refresh_cache=args.refresh_cache,
+                          adaptive=args.adaptive, retry_delay=args.auto_retry_delay,
+                          use_python_whois=args.python_whois, timeout=args.timeout,
+                          routes={tld: backends.split(',') for tld, backends in parse_pairs(parser, "--route", args.route).items()},
+                          cache_free=not args.verify_free)  # Frees are cached only once verified
+
+    backend_kwargs = None
+    rdap_servers = parse_pairs(parser, "--rdap-server", args.rdap_server)
+    zone_indexes = parse_pairs(parser, "--zone-index", args.zone_index)
+    if args.rdap or rdap_servers or zone_indexes:
+        backend_kwargs = dict(rdap=args.rdap, rdap_servers=rdap_servers, zone_indexes=zone_indexes, timeout=args.timeout)
+    available = {"whois"} | ({"rdap"} if args.rdap or rdap_servers else set()) | ({"zone"} if zone_indexes else set())
+    for tld, names in checker_kwargs["routes"].items():
+        if not set(names) <= available:
+            parser.error(f"--route for .{tld} uses backends that are not enabled: {', '.join(sorted(set(names) - available))}")
+
+    collector = None
+    if args.stats_interval or args.metrics_port:
+        collector = MetricsCollector()
+        if args.metrics_port:
+            serve_metrics(collector, args.metrics_port)
+        reporter = StatsReporter(collector, args.stats_interval).start() if args.stats_interval else None
+
+    if args.serve or args.unix_socket:
+        serve(args, checker_kwargs, cache_kwargs, dns_kwargs, backend_kwargs, collector)
+        if collector is not None and reporter is not None:
+            reporter.stop()
+        return
+
+    source = None
+    known = None
+    if args.generate:
+        from candidates import CandidateGenerator
+        # Generated names are valid and unique per pattern already, so they skip the normalizer
+        if args.skip_known and cache_kwargs is not None:
+            known = ResultCache(**cache_kwargs, read_only=True)
+        try:
+            normalizer = CandidateGenerator(args.generate, args.tlds.split(','), parse_pairs(parser, "--wordlist", args.wordlist),
+                                            min_length=args.min_length, max_length=args.max_length,
+                                            include=args.include, exclude=args.exclude, known=known)
+        except (ValueError, OSError, re.error) as e:
+            parser.error(f"--generate: {e}")
+        if args.list_candidates:
+            for domain in normalizer.iter_domains():
+                print(domain)
+            if known is not None:
+                known.close()
+            return
+        info(f"Generating up to {normalizer.estimate()} candidates...")
+        domains = normalizer.iter_domains()
     else:
-        if sys.stdin.isatty():
-            parser.print_help()
-            print("\nNote: If no --input is provided, domains are read from stdin. Use pipe or redirect input.")
-            sys.exit(0)
+        # Read domains lazily so memory does not grow with the input size
+        if args.input:
+            source = open(args.input, 'r')
         else:
-            print("Reading domains from stdin...")
-            domains = [line.strip() for line in sys.stdin if line.strip()]
+            if sys.stdin.isatty():
+                parser.print_help()
+                print("\nNote: If no --input is provided, domains are read from stdin. Use pipe or redirect input.")
+                sys.exit(0)
+            else:
+                info("Reading domains from stdin...")
+                source = sys.stdin
 
-    if not domains:
-        print("No domains provided.")
+        # Normalized, deduplicated domains, read one line at a time
+        # Exact until EXACT_DEDUPE_LIMIT domains, then a Bloom filter, so memory stays bounded; --bloom skips the exact stage
+        normalizer = DomainNormalizer(dedupe=args.dedupe, bloom_capacity=args.bloom,
+                                      exact_limit=None if args.bloom else EXACT_DEDUPE_LIMIT)
+        domains = normalizer.iter_domains(source)
+    first = next(domains, None)
+    if first is None:
+        info("No domains provided.")
         sys.exit(1)
+    domains = itertools.chain([first], domains)
+
+    completed = load_journal(args.checkpoint) if args.resume else {}
+    if completed:
+        info(f"Resuming: {len(completed)} domains already checked.")
+        domains = (domain for domain in domains if domain not in completed)
+    journal = CheckpointJournal(args.checkpoint, resume=args.resume)
+
+    tracker = None
+    if structured:
+        from output import ResultTracker, ResultWriter
+        tracker = ResultTracker()
+    checker = None
+    sharded_cache = None
+    if args.workers > 1:
+        # Observers cannot cross process boundaries, so sharded runs only count results.
+        # Workers only read the cache; this process stores their results, and the verifier's, through one connection
+        sharded_cache = ResultCache(**cache_kwargs) if cache_kwargs is not None else None
+        results = iter_check_sharded(domains, args.workers, checker_kwargs, cache_kwargs, dns_kwargs,
+                                     shard_by=args.shard_by, window=args.window, backend_kwargs=backend_kwargs,
+                                     cache=sharded_cache)
+    else:
+        observers = [observer for observer in (collector, tracker) if observer is not None]
+        observer = ObserverGroup(*observers) if len(observers) > 1 else (observers[0] if observers else None)
+        checker = build_checker(dict(checker_kwargs, observer=observer), cache_kwargs, dns_kwargs, backend_kwargs)
+        results = checker.iter_check_domains(domains, window=args.window, with_stage=True)
+    if args.verify_free:
+        from verify import FreeVerifier
+        verifier_checker = checker
+        if verifier_checker is None:
+            # Sharded runs re-check frees in this process, storing verified results through the shared cache
+            verifier_checker = build_checker(checker_kwargs, None, None, backend_kwargs)
+            verifier_checker.cache = sharded_cache
+        results = FreeVerifier(verifier_checker, delay=args.verify_delay,
+                               max_concurrency=args.verify_threads).iter_verified(results)
 
-    checker = DomainChecker(max_threads=args.threads, max_retries=args.retries, base_backoff=args.backoff, jitter=args.jitter)
+    stages = Counter()
 
-    def callback(domain, status):
+    def callback(domain, status, stage):
+        stages[stage] += 1
+        if collector is not None and checker is None:
+            collector.on_result(domain, status, stage, 0)
         if args.verbose:
             if status == 'free':
-                print(f"FREE\t{domain}")
+                info(f"FREE\t{domain}\t({stage})")
             elif status == 'occupied':
-                print(f"OCCUPIED\t{domain}")
+                info(f"OCCUPIED\t{domain}\t({stage})")
             else:
-                print(f"ERROR\t{domain}\t{status}")
-
-    results = checker.check_domains(domains, callback=callback)
-
-    # Auto-retry errors if enabled
-    if args.auto_retry_delay > 0:
-        error_domains = [domain for domain, status in results if status.startswith('error:')]
-        if error_domains:
-            print(f"Found {len(error_domains)} errors. Retrying after {args.auto_retry_delay} seconds...")
-            time.sleep(args.auto_retry_delay)
-            retry_results = checker.check_domains(error_domains, callback=callback)
-            # Update original results
-            retry_dict = dict(retry_results)
-            results = [(domain, retry_dict.get(domain, status)) for domain, status in results]
-
-    # Write to files
-    with open(args.output_free, 'w') as ff, open(args.output_occupied, 'w') as fo, open(args.output_errors, 'w') as fe, open(args.output_all, 'w') as fa:
-        for domain, status in results:
-            fa.write(f"{domain}\t{status}\n")
-            if status == 'free':
-                ff.write(f"{domain}\n")
-            elif status == 'occupied':
-                fo.write(f"{domain}\n")
+                info(f"ERROR\t{domain}\t{status}\t({stage})")
+
+    with contextlib.ExitStack() as stack:
+        if structured:
+            # Rows are written in batches; the journal still records every result as it completes
+            if to_stdout:
+                stream = sys.stdout
             else:
-                fe.write(f"{domain}\t{status}\n")
+                stream = stack.enter_context(open(args.results_file or f"all_domains.{args.format}", 'w', encoding='utf-8', newline=''))
+            writer = stack.enter_context(ResultWriter(stream, args.format))
+
+            def write_result(domain, status):
+                writer.write(tracker.record(domain, status))
+        else:
+            # Results are appended as they complete (line-buffered), so a crash keeps everything checked so far
+            ff = stack.enter_context(open(args.output_free, 'w', buffering=1))
+            fo = stack.enter_context(open(args.output_occupied, 'w', buffering=1))
+            fe = stack.enter_context(open(args.output_errors, 'w', buffering=1))
+            fa = stack.enter_context(open(args.output_all, 'w', buffering=1))
+
+            def write_result(domain, status):
+                fa.write(f"{domain}\t{status}\n")
+                if status == 'free':
+                    ff.write(f"{domain}\n")
+                elif status == 'occupied':
+                    fo.write(f"{domain}\n")
+                else:
+                    fe.write(f"{domain}\t{status}\n")
+
+        # The journal is the source of truth on resume: output files are rebuilt from it, then appended to
+        for domain, status in completed.items():
+            write_result(domain, status)
+
+        def finish(domain, status):
+            write_result(domain, status)
+            journal.record(domain, status)
+
+        # Errors get their auto-retry round inside the same stream, so each domain is written once
+        for domain, status, stage in results:
+            callback(domain, status, stage)
+            finish(domain, status)
+
+    journal.close()
+    if source is not None and source is not sys.stdin:
+        source.close()
+    if known is not None:
+        known.close()
+    if checker is not None and checker.cache is not None:
+        checker.cache.close()
+    if sharded_cache is not None:
+        sharded_cache.close()
+
+    if collector is not None:
+        if reporter is not None:
+            reporter.stop()
+        print(collector.stats_line(), file=sys.stderr)
 
-    print("Checking complete. Results saved to files.")
+    info("Checking complete. Results saved to files.")
+    info(f"Input: {normalizer.summary()}")
+    if stages:
+        info("Decided by: " + ", ".join(f"{stage} {count}" for stage, count in sorted(stages.items())))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,204 @@
+import asyncio
+import queue
+import random
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DNS_TYPE_NS = 2
+DNS_CLASS_IN = 1
+DNS_RCODE_NOERROR = 0
+DNS_RCODE_NXDOMAIN = 3
+
+IDLE_POLL_INTERVAL = 0.05
+
+# Pipeline items are (domain, status, stage); status None means no stage has decided the domain yet
+PipelineItem = Tuple[str, Optional[str], Optional[str]]
+
+
+def build_query(query_id: int, domain: str, qtype: int = DNS_TYPE_NS) -> bytes:
+    """
+    Build a recursive DNS query packet for domain.
+    """
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)  # RD set, one question
+    qname = b''.join(bytes([len(label)]) + label for label in domain.rstrip('.').encode('ascii').split(b'.')) + b'\x00'
+    return header + qname + struct.pack('!HH', qtype, DNS_CLASS_IN)
+
+
+def parse_response(data: bytes) -> Tuple[int, int, int, bool]:
+    """
+    Return (query_id, rcode, answer_count, truncated) from a DNS response header.
+    """
+    query_id, flags, _, ancount, _, _ = struct.unpack('!HHHHHH', data[:12])
+    return query_id, flags & 0x000F, ancount, bool(flags & 0x0200)
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    """
+    One UDP socket shared by all in-flight queries, matched to their futures by query ID.
+    """
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        future = self.pending.pop(struct.unpack('!H', data[:2])[0], None)
+        if future is not None and not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.pending.clear()
+
+
+class DnsPrefilter:
+    """
+    Cheap DNS stage in front of WHOIS: domains with an NS delegation are registered,
+    so they are marked 'occupied' without spending WHOIS rate budget.
+    NXDOMAIN, timeouts and anything ambiguous fall through to WHOIS.
+    Point resolver/port at a local stub DNS server for testing.
+    """
+    def __init__(self, resolver: str = '8.8.8.8', port: int = 53, timeout: float = 2.0, retries: int = 1,
+                 max_concurrency: int = 200):
+        self.resolver = resolver
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_concurrency = max_concurrency
+        self.protocol: Optional[_DnsProtocol] = None
+
+    async def _ensure_socket(self):
+        if self.protocol is None or self.protocol.transport is None or self.protocol.transport.is_closing():
+            loop = asyncio.get_running_loop()
+            _, self.protocol = await loop.create_datagram_endpoint(_DnsProtocol, remote_addr=(self.resolver, self.port))
+
+    async def is_delegated(self, domain: str) -> bool:
+        """
+        True if the resolver returns NS records for domain, False for NXDOMAIN, errors and timeouts.
+        """
+        try:
+            await self._ensure_socket()
+        except OSError:
+            return False
+        protocol = self.protocol
+        for _ in range(self.retries + 1):
+            query_id = random.randrange(65536)
+            while query_id in protocol.pending:
+                query_id = random.randrange(65536)
+            try:
+                packet = build_query(query_id, domain)
+            except (UnicodeError, ValueError):
+                return False
+            future = asyncio.get_running_loop().create_future()
+            protocol.pending[query_id] = future
+            protocol.transport.sendto(packet)
+            try:
+                data = await asyncio.wait_for(future, self.timeout)
+            except (asyncio.TimeoutError, OSError):
+                protocol.pending.pop(query_id, None)
+                continue
+            _, rcode, ancount, truncated = parse_response(data)
+            return rcode == DNS_RCODE_NOERROR and (ancount > 0 or truncated)
+        return False
+
+    async def filter_items(self, items: Iterable[PipelineItem], emit, control=None):
+        """
+        Resolve every undecided item with at most max_concurrency queries in flight,
+        passing already decided items through, and await emit(item) for each result.
+        When emit returns False the consumer is gone, and workers stop pulling input.
+        A None from items means no input yet; the worker that got it polls again shortly.
+        control is an optional CheckControl: no queries are sent while it is paused,
+        and the stage stops once it is cancelled.
+        """
+        source = iter(items)
+        try:
+            await self._ensure_socket()  # Open the shared socket before workers race to do it
+        except OSError:
+            pass
+
+        async def worker():
+            for item in source:
+                if control is not None and control.cancelled:
+                    return
+                if item is None:  # The input has nothing yet
+                    await asyncio.sleep(IDLE_POLL_INTERVAL)
+                    continue
+                domain, status, stage = item
+                while control is not None and control.paused and not control.cancelled:
+                    await asyncio.sleep(control.POLL_INTERVAL)
+                if control is not None and control.cancelled:
+                    return
+                if status is None and await self.is_delegated(domain):
+                    status, stage = 'occupied', 'dns'
+                if await emit((domain, status, stage)) is False:
+                    return
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, self.max_concurrency))))
+        finally:
+            if self.protocol is not None and self.protocol.transport is not None:
+                self.protocol.transport.close()
+            self.protocol = None
+
+    def run(self, domains: List[str]) -> List[Tuple[str, bool]]:
+        """
+        Blocking batch helper: returns (domain, delegated) for every domain.
+        """
+        results = []
+
+        async def emit(item):
+            results.append((item[0], item[1] == 'occupied'))
+
+        asyncio.run(self.filter_items(((domain, None, None) for domain in domains), emit))
+        return results
+
+    def iter_filter(self, items: Iterable[PipelineItem], window: int = 1000, control=None) -> Iterator[PipelineItem]:
+        """
+        Run the DNS stage on a background event loop and yield items as they are resolved.
+        At most window resolved items are buffered, so the stage applies backpressure to its input.
+        The background loop shuts down when the consumer stops iterating or control is cancelled.
+        While nothing is resolved, None is yielded every IDLE_POLL_INTERVAL, so the consumer can tend to
+        other work instead of blocking here.
+        """
+        out = queue.Queue(maxsize=window)
+        done = object()
+        stopped = threading.Event()
+
+        async def emit(item):
+            while not stopped.is_set():
+                try:
+                    out.put_nowait(item)
+                    return True
+                except queue.Full:
+                    await asyncio.sleep(0.01)
+            return False
+
+        def run():
+            try:
+                asyncio.run(self.filter_items(items, emit, control))
+            except BaseException as e:
+                out.put(e)
+            out.put(done)
+
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = out.get(timeout=IDLE_POLL_INTERVAL)
+                except queue.Empty:
+                    yield None
+                    continue
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
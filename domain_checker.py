@@ -1,67 +1,990 @@
-import whois
-import whois.parser
-import concurrent.futures
-from typing import List, Tuple, Callable
+# python-whois and concurrent.futures are imported where they are first used, and AsyncDomainChecker
+# lives in async_checker.py with asyncio, so the CLI starts quickly for --help and one-off checks
+# (see cli.py --self-test-startup)
+from typing import List, Tuple, Callable, Dict, Optional, Iterable, Iterator
+import functools
 import threading
 import queue
 import time
 import socket
 import random
+import re
+import heapq
+import sys
+from collections import Counter, deque
+from enum import Enum
+
+from metrics import LookupEvent
+
+WHOIS_PORT = 43
+IANA_WHOIS_SERVER = 'whois.iana.org'
+
+# Authoritative port-43 servers for common TLDs; anything else is looked up via IANA referral
+WHOIS_SERVERS = {
+    'com': 'whois.verisign-grs.com',
+    'net': 'whois.verisign-grs.com',
+    'org': 'whois.pir.org',
+    'info': 'whois.nic.info',
+    'biz': 'whois.nic.biz',
+    'io': 'whois.nic.io',
+    'co': 'whois.nic.co',
+    'me': 'whois.nic.me',
+    'ai': 'whois.nic.ai',
+    'app': 'whois.nic.google',
+    'dev': 'whois.nic.google',
+    'xyz': 'whois.nic.xyz',
+    'online': 'whois.nic.online',
+    'site': 'whois.nic.site',
+    'de': 'whois.denic.de',
+    'uk': 'whois.nic.uk',
+    'ru': 'whois.tcinet.ru',
+    'fr': 'whois.nic.fr',
+    'nl': 'whois.domain-registry.nl',
+    'eu': 'whois.eu',
+    'us': 'whois.nic.us',
+    'ca': 'whois.cira.ca',
+    'jp': 'whois.jprs.jp',
+}
+
+# Some registries expect extra flags around the bare domain name
+WHOIS_QUERY_FORMATS = {
+    'whois.denic.de': '-T dn,ace {}',
+    'whois.jprs.jp': '{}/e',
+}
+
+WHOIS_NOT_FOUND_RE = re.compile(
+    r'no match|not found|no data found|no entries found|no object found|'
+    r'status:\s*(free|available)|is available for|domain not found',
+    re.IGNORECASE,
+)
+WHOIS_RATE_LIMIT_RE = re.compile(
+    r'limit exceeded|exceeded.{0,40}limit|too many (queries|requests)|try again later|quota exceeded',
+    re.IGNORECASE,
+)
+WHOIS_DOMAIN_NAME_RE = re.compile(r'^\s*domain( name)?:\s*\S', re.IGNORECASE | re.MULTILINE)
+# Fields only present in an actual registration record; together with a domain line they prove registration
+WHOIS_REGISTERED_RE = re.compile(
+    r'^\s*(registry domain id|registrar|creation date|created|registered on|name servers?|nserver)\s*:',
+    re.IGNORECASE | re.MULTILINE,
+)
+WHOIS_REFER_RE = re.compile(r'^[ \t]*(refer|whois):[ \t]*(\S+)', re.IGNORECASE | re.MULTILINE)
+
+# Exact "no such domain" replies of registries, keyed by TLD. The second-stage check of free results
+# (see verify.py) only trusts these for their TLD, since WHOIS_NOT_FOUND_RE is loose enough to match
+# error pages; TLDs not listed fall back to it. Compiled on first use by not_found_re, since only
+# --verify-free needs them.
+_NOT_FOUND_PATTERNS = {
+    ('com', 'net'): r'^No match for "',
+    ('org', 'info', 'io', 'me'): r'^(NOT FOUND|Domain not found\.)',
+    ('app', 'dev'): r'^Domain not found\.',
+    ('xyz', 'online', 'site'): r'DOMAIN NOT FOUND',
+    ('biz', 'co', 'us'): r'^No Data Found',
+    ('de',): r'^Status:\s*free',
+    ('uk',): r'^\s*(No match for "|This domain name has not been registered)',
+    ('fr',): r'^%+\s*NOT FOUND',
+    ('nl',): r'\bis free\b',
+    ('eu',): r'^Status:\s*AVAILABLE',
+    ('ca',): r'^Not found:',
+    ('jp',): r'^No match!!',
+    ('ru',): r'^No entries found',
+}
+WHOIS_NOT_FOUND_BY_TLD = {tld: pattern for tlds, pattern in _NOT_FOUND_PATTERNS.items() for tld in tlds}
+
+
+class ErrorKind(str, Enum):
+    """
+    Why a lookup failed. Error statuses read 'error: <kind>: <message>', so the kind survives
+    the cache, checkpoint journals and saved sessions, which all store plain status strings.
+    """
+    TIMEOUT = 'timeout'
+    RESET = 'reset'  # Connection reset by peer (error 54 on Mac, 104 on Linux)
+    RATE_LIMITED = 'rate-limited'
+    NETWORK = 'network'  # Refused, unreachable, temporary DNS failure
+    PARSE = 'parse'
+    UNKNOWN_TLD = 'unknown-tld'
+    OTHER = 'other'
+
+
+# Kinds worth another attempt by default; the rest fail on the first try instead of using up retries
+RETRYABLE_KINDS = frozenset({ErrorKind.TIMEOUT, ErrorKind.RESET, ErrorKind.RATE_LIMITED, ErrorKind.NETWORK})
+ERROR_STATUS_RE = re.compile(r'^error: ([a-z-]+): ')
+
+
+class UnknownTldError(LookupError):
+    """
+    No server or backend can check a domain's TLD: IANA has no referral for it,
+    or the server it refers to has no address.
+    """
+
+
+def error_status(kind: ErrorKind, message: str) -> str:
+    """
+    Build the status string for an error. It is interned, so the many identical
+    errors of a large run (resets, timeouts) share one string.
+    """
+    return sys.intern(f'error: {kind.value}: {message}')
+
+
+def error_kind(status: str) -> Optional[ErrorKind]:
+    """
+    ErrorKind of an error status, None for 'free', 'occupied' and GUI states like 'Pending'.
+    Statuses written before kinds existed ('error: ...', 'error 54: ...') are classified by their text.
+    """
+    if not status.startswith('error'):
+        return None
+    match = ERROR_STATUS_RE.match(status)
+    if match:
+        try:
+            return ErrorKind(match.group(1))
+        except ValueError:
+            pass
+    text = status.lower()
+    if 'rate limit' in text:
+        return ErrorKind.RATE_LIMITED
+    if status.startswith('error 54') or 'reset' in text:
+        return ErrorKind.RESET
+    if 'timed out' in text or 'timeout' in text:
+        return ErrorKind.TIMEOUT
+    return ErrorKind.OTHER
+
+
+def is_error(status: str) -> bool:
+    return error_kind(status) is not None
+
+
+def classify_exception(e: BaseException) -> ErrorKind:
+    """
+    Map an exception raised by a lookup to its ErrorKind.
+    """
+    asyncio = sys.modules.get('asyncio')  # Only loaded by AsyncDomainChecker; its TimeoutError differs before 3.11
+    if isinstance(e, (socket.timeout, TimeoutError)) or (asyncio is not None and isinstance(e, asyncio.TimeoutError)):
+        return ErrorKind.TIMEOUT
+    if isinstance(e, (ConnectionResetError, ConnectionAbortedError, BrokenPipeError)) or getattr(e, 'errno', None) == 54:
+        return ErrorKind.RESET
+    if isinstance(e, OSError):
+        return ErrorKind.NETWORK  # Including failures to resolve a server, unless it raised UnknownTldError
+    if isinstance(e, UnknownTldError):
+        return ErrorKind.UNKNOWN_TLD
+    if isinstance(e, (UnicodeError, ValueError)):
+        return ErrorKind.PARSE
+    return ErrorKind.OTHER
+
+
+def exception_status(e: BaseException) -> str:
+    return error_status(classify_exception(e), str(e) or type(e).__name__)
+
+
+WHOIS_RATE_LIMITED = error_status(ErrorKind.RATE_LIMITED, 'WHOIS server asked us to slow down')
+UNCONFIRMED_FREE = error_status(ErrorKind.PARSE, 'free result not confirmed by a second lookup')
+
+
+def get_tld(domain: str) -> str:
+    return domain.rstrip('.').rsplit('.', 1)[-1].lower()
+
+
+def classify_partial(text: str) -> Optional[str]:
+    """
+    Classify a possibly incomplete WHOIS response, or return None if more of it is needed.
+    Lets clients hang up as soon as the first bytes settle the answer.
+    """
+    if WHOIS_RATE_LIMIT_RE.search(text):
+        return WHOIS_RATE_LIMITED
+    if WHOIS_DOMAIN_NAME_RE.search(text) and WHOIS_REGISTERED_RE.search(text):
+        return 'occupied'
+    if WHOIS_NOT_FOUND_RE.search(text):
+        return 'free'
+    return None
+
+
+def parse_whois_response(text: str) -> str:
+    """
+    Classify a raw WHOIS response the same way check_domain does:
+    'occupied' if a domain record is present, 'error: ...' if the server is throttling us,
+    'free' otherwise (no domain_name, as with python-whois).
+    """
+    status = classify_partial(text)
+    if status is not None:
+        return status
+    if WHOIS_DOMAIN_NAME_RE.search(text):
+        return 'occupied'
+    return 'free'
+
+
+@functools.lru_cache(maxsize=None)
+def not_found_re(tld: str) -> 're.Pattern':
+    pattern = WHOIS_NOT_FOUND_BY_TLD.get(tld)
+    return re.compile(pattern, re.IGNORECASE | re.MULTILINE) if pattern else WHOIS_NOT_FOUND_RE
+
+
+def confirm_whois_response(text: str, tld: str) -> str:
+    """
+    Strict classification of a complete WHOIS response for re-checking a free result:
+    'free' only when the reply matches the TLD's not-found pattern, UNCONFIRMED_FREE when it
+    neither shows a registration nor says the name is unregistered.
+    """
+    if WHOIS_RATE_LIMIT_RE.search(text):
+        return WHOIS_RATE_LIMITED
+    if WHOIS_DOMAIN_NAME_RE.search(text) and WHOIS_REGISTERED_RE.search(text):
+        return 'occupied'
+    if not_found_re(tld).search(text):
+        return 'free'
+    if WHOIS_DOMAIN_NAME_RE.search(text):
+        return 'occupied'
+    return UNCONFIRMED_FREE
+
+
+def referral_error(e: socket.gaierror, server: str, referred: Iterable[str]) -> Exception:
+    """
+    The exception to raise when server does not resolve. A server IANA referred a TLD to that has no
+    address means the TLD has no working WHOIS service; anything else, such as a built-in server on a
+    host without working DNS, or a passing failure (EAI_AGAIN), stays a retryable network error.
+    """
+    if server in referred and e.errno != socket.EAI_AGAIN:
+        return UnknownTldError(f'WHOIS server {server} for this TLD does not resolve: {e}')
+    return e
+
+
+def backoff_delay(base_backoff: float, attempt: int, jitter: bool) -> float:
+    """
+    Exponential backoff before retry number attempt + 1, optionally with up to 100% jitter.
+    """
+    backoff = base_backoff ** attempt
+    if jitter:
+        backoff += random.uniform(0, backoff)  # Add jitter for better distribution
+    return backoff
+
+
+def add_span(trace: dict, span: str, seconds: float):
+    spans = trace.setdefault('spans', {})
+    spans[span] = spans.get(span, 0.0) + seconds
+
+
+def whois_server_for(domain: str) -> str:
+    """
+    Best-effort authoritative WHOIS server for a domain without touching the network.
+    Unknown TLDs map to the whois.nic.<tld> convention, which is also a stable scheduling key.
+    """
+    tld = get_tld(domain)
+    return WHOIS_SERVERS.get(tld) or f'whois.nic.{tld}'
+
+
+class WhoisClient:
+    """
+    Lean blocking port-43 WHOIS client used by DomainChecker instead of python-whois.
+    Queries only the registry server (no registrar follow-ups), caches the TLD -> server
+    referral map and each server's resolved address, enforces separate connect and read
+    timeouts, and stops reading as soon as the first bytes settle free/occupied.
+    Pass server/port to send every query to a fixed WHOIS server (e.g. a local fake one).
+    """
+    def __init__(self, connect_timeout: float = 5.0, read_timeout: float = 10.0, server: Optional[str] = None,
+                 port: int = WHOIS_PORT, max_bytes: int = 65536):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.server = server
+        self.port = port
+        self.max_bytes = max_bytes
+        self.servers: Dict[str, str] = dict(WHOIS_SERVERS)
+        self.referred = set()  # Servers learned from IANA referrals rather than WHOIS_SERVERS
+        self.addresses: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+
+    def address_for(self, server: str) -> tuple:
+        address = self.addresses.get(server)
+        if address is None:
+            family, socktype, proto, _, sockaddr = socket.getaddrinfo(server, self.port, type=socket.SOCK_STREAM)[0]
+            address = self.addresses[server] = (family, socktype, proto, sockaddr)
+        return address
+
+    def query(self, server: str, query: str, early: bool = True, trace: Optional[dict] = None) -> str:
+        """
+        Send one query and return the response text, or just its first chunks if early
+        and they already settle the answer.
+        With a trace dict, seconds spent in 'resolve', 'connect' and 'read' and the 'bytes'
+        received are added to it.
+        """
+        started = time.monotonic()
+        try:
+            family, socktype, proto, sockaddr = self.address_for(server)
+        except socket.gaierror as e:
+            raise referral_error(e, server, self.referred)
+        resolved = time.monotonic()
+        sock = socket.socket(family, socktype, proto)
+        data = b''
+        connected = None
+        try:
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(sockaddr)
+            except OSError:
+                self.addresses.pop(server, None)  # Re-resolve next time in case the server moved
+                raise
+            connected = time.monotonic()
+            sock.settimeout(self.read_timeout)
+            sock.sendall(f"{query}\r\n".encode('utf-8'))
+            while len(data) < self.max_bytes:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+                if early and classify_partial(data.decode('utf-8', errors='replace')) is not None:
+                    break
+        finally:
+            sock.close()
+            if trace is not None:
+                finished = time.monotonic()
+                add_span(trace, 'resolve', resolved - started)
+                if connected is None:
+                    add_span(trace, 'connect', finished - resolved)
+                else:
+                    add_span(trace, 'connect', connected - resolved)
+                    add_span(trace, 'read', finished - connected)
+                trace['bytes'] = trace.get('bytes', 0) + len(data)
+        if not data.strip():
+            raise ConnectionResetError(f'empty response from {server}')
+        return data.decode('utf-8', errors='replace')
+
+    def server_for(self, domain: str, trace: Optional[dict] = None) -> str:
+        """
+        Return the WHOIS server for the domain's TLD, asking IANA once per unknown TLD.
+        The IANA round trip is recorded as the 'referral' span of trace.
+        """
+        if self.server:
+            return self.server
+        tld = get_tld(domain)
+        server = self.servers.get(tld)
+        if server is None:
+            started = time.monotonic()
+            try:
+                match = WHOIS_REFER_RE.search(self.query(IANA_WHOIS_SERVER, tld, early=False))
+            finally:
+                if trace is not None:
+                    add_span(trace, 'referral', time.monotonic() - started)
+            if not match:
+                raise UnknownTldError(f'no WHOIS server known for .{tld}')
+            with self.lock:
+                server = self.servers[tld] = match.group(2)
+                self.referred.add(server)
+        return server
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> str:
+        """
+        Return 'free', 'occupied' or WHOIS_RATE_LIMITED for domain; raises OSError on network failures.
+        With a trace dict, the 'server' queried, the 'bytes' received and the time spent in each
+        phase ('referral', 'resolve', 'connect', 'read', 'parse', in seconds) are recorded in it.
+        """
+        server = self.server_for(domain, trace)
+        if trace is not None:
+            trace['server'] = server
+        text = self.query(server, WHOIS_QUERY_FORMATS.get(server, '{}').format(domain), trace=trace)
+        started = time.monotonic()
+        status = parse_whois_response(text)
+        if trace is not None:
+            add_span(trace, 'parse', time.monotonic() - started)
+        return status
+
+
+class LookupBackend:
+    """
+    A source of answers DomainChecker routes domains to; see backends.py for RDAP and zone files.
+    lookup() returns a status, or None to pass the domain on to the next backend of its route,
+    and raises on network failures like WhoisClient.lookup.
+    Local backends need no network: they are asked before the scheduler, like the cache.
+    """
+    name = 'backend'
+    local = False
+
+    def server_for(self, domain: str) -> Optional[str]:
+        """
+        Scheduling key (the host queried) for domain, or None when this backend cannot check its TLD.
+        """
+        raise NotImplementedError
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> Optional[str]:
+        raise NotImplementedError
+
+    def confirm_free(self, domain: str, trace: Optional[dict] = None) -> Optional[str]:
+        """
+        Re-check a domain another lookup found free, as carefully as this backend can; see verify.py.
+        """
+        return self.lookup(domain, trace)
+
+
+class WhoisBackend(LookupBackend):
+    """
+    Port-43 WHOIS through a WhoisClient, or python-whois; checks every TLD, so it ends every route.
+    """
+    name = 'whois'
+
+    def __init__(self, client: WhoisClient, use_python_whois: bool = False):
+        self.client = client
+        self.use_python_whois = use_python_whois
+        self.whois = None
+        if use_python_whois:
+            import whois  # Slow to import, so only loaded when asked for
+            self.whois = whois
+
+    def server_for(self, domain: str) -> str:
+        return whois_server_for(domain)
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> str:
+        if not self.use_python_whois:
+            return self.client.lookup(domain, trace)
+        try:
+            info = self.whois.whois(domain)
+            return 'occupied' if info.domain_name else 'free'  # If whois returns info, it's likely occupied
+        except self.whois.parser.PywhoisError:
+            return 'free'
+
+    def confirm_free(self, domain: str, trace: Optional[dict] = None) -> str:
+        """
+        Read the registry's whole reply and classify it with confirm_whois_response.
+        Always uses WhoisClient: python-whois parse failures are what produce false frees.
+        """
+        server = self.client.server_for(domain, trace)
+        if trace is not None:
+            trace['server'] = server
+        text = self.client.query(server, WHOIS_QUERY_FORMATS.get(server, '{}').format(domain), early=False, trace=trace)
+        return confirm_whois_response(text, get_tld(domain))
+
+
+class BackendRouter:
+    """
+    Picks the backends that check each TLD. backends are listed cheapest first and by default every
+    TLD tries them in that order, skipping those that cannot serve it; routes maps a TLD to the
+    names of the backends to try instead, e.g. {'com': ['zone', 'rdap']}.
+    """
+    def __init__(self, backends: Iterable[LookupBackend], routes: Optional[Dict[str, Iterable[str]]] = None):
+        self.backends = {backend.name: backend for backend in backends}
+        self.default = list(self.backends)
+        self.routes: Dict[str, List[str]] = {}
+        for tld, names in (routes or {}).items():
+            names = list(names)
+            unknown = [name for name in names if name not in self.backends]
+            if unknown:
+                raise ValueError(f"route for .{tld} names unknown backends: {', '.join(unknown)}")
+            self.routes[tld.lower().lstrip('.')] = names
+        self.chains: Dict[str, Tuple[List[LookupBackend], List[LookupBackend]]] = {}
+
+    def chain(self, domain: str) -> Tuple[List[LookupBackend], List[LookupBackend]]:
+        """
+        (local, remote) backends for domain's TLD, in route order. Built once per TLD.
+        """
+        tld = get_tld(domain)
+        chain = self.chains.get(tld)
+        if chain is None:
+            backends = [self.backends[name] for name in self.routes.get(tld, self.default)]
+            backends = [backend for backend in backends if backend.server_for(domain) is not None]
+            chain = self.chains[tld] = ([backend for backend in backends if backend.local],
+                                        [backend for backend in backends if not backend.local])
+        return chain
+
+    def local_lookup(self, domain: str) -> Optional[Tuple[str, str]]:
+        """
+        (status, backend name) from the first local backend that knows domain, else None.
+        """
+        for backend in self.chain(domain)[0]:
+            status = backend.lookup(domain)
+            if status is not None:
+                return status, backend.name
+        return None
+
+    def server_for(self, domain: str) -> str:
+        remote = self.chain(domain)[1]
+        return remote[0].server_for(domain) if remote else whois_server_for(domain)
+
+    def lookup(self, domain: str, trace: Optional[dict] = None) -> str:
+        for backend in self.chain(domain)[1]:
+            status = backend.lookup(domain, trace)
+            if status is not None:
+                return status
+        raise UnknownTldError(f'no lookup backend can check .{get_tld(domain)}')
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. rate is tokens per second, burst the bucket size.
+    A rate of None means unlimited.
+    """
+    def __init__(self, rate: Optional[float] = None, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Take a token if one is available and return 0, otherwise return seconds until the next one.
+        """
+        if self.rate is None:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class AimdController:
+    """
+    Additive-increase/multiplicative-decrease concurrency limit, as in TCP congestion control.
+    The limit grows by about `increase` per limit's worth of successes while latency stays within
+    tolerance x its running average, and is multiplied by `decrease` on a reset or timeout.
+    Cuts happen at most once per cooldown seconds (default: one average lookup latency, like once per RTT),
+    so one burst of failures counts as one congestion event.
+    """
+    def __init__(self, initial: float = 2, minimum: int = 1, maximum: int = 64, increase: float = 1.0,
+                 decrease: float = 0.5, tolerance: float = 2.0, cooldown: Optional[float] = None):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self.latency = None  # Running average of successful lookup latency
+        self.last_cut = float('-inf')
+        self.lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return max(self.minimum, int(self.limit))
+
+    def on_success(self, latency: float):
+        with self.lock:
+            stable = self.latency is None or latency <= self.latency * self.tolerance
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            if stable:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_failure(self):
+        with self.lock:
+            now = time.monotonic()
+            cooldown = self.cooldown if self.cooldown is not None else (self.latency or 1.0)
+            if now - self.last_cut >= cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.last_cut = now
+
+
+class WhoisScheduler:
+    """
+    Groups pending domains by authoritative WHOIS server and hands them out round-robin,
+    so each server gets its own token bucket and concurrency cap instead of sharing one global pool.
+    server_limits overrides (rate, max_concurrent) for individual servers.
+    With controller_factory, each server also gets an AimdController whose limit further caps its concurrency.
+    """
+    def __init__(self, rate: Optional[float] = None, burst: int = 1, max_per_server: Optional[int] = None,
+                 server_limits: Optional[Dict[str, Tuple[Optional[float], Optional[int]]]] = None,
+                 server_for: Callable[[str], str] = whois_server_for,
+                 controller_factory: Optional[Callable[[], AimdController]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.max_per_server = max_per_server
+        self.server_limits = server_limits or {}
+        self.server_for = server_for
+        self.controller_factory = controller_factory
+        self.controllers: Dict[str, AimdController] = {}
+        self.queues: Dict[str, deque] = {}
+        self.order: deque = deque()  # Servers with queued work, in round-robin order
+        self.active: Dict[str, int] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def limits_for(self, server: str) -> Tuple[Optional[float], Optional[int]]:
+        return self.server_limits.get(server, (self.rate, self.max_per_server))
+
+    def controller(self, server: str) -> Optional[AimdController]:
+        if self.controller_factory is None:
+            return None
+        with self.lock:
+            if server not in self.controllers:
+                self.controllers[server] = self.controller_factory()
+            return self.controllers[server]
+
+    def cap_for(self, server: str) -> Optional[int]:
+        # Caller holds self.lock
+        cap = self.limits_for(server)[1]
+        controller = self.controllers.get(server)
+        if controller is not None:
+            cap = controller.current if cap is None else min(cap, controller.current)
+        return cap
+
+    def add(self, domain: str):
+        server = self.server_for(domain)
+        with self.lock:
+            if server not in self.queues:
+                self.queues[server] = deque()
+                self.active.setdefault(server, 0)
+                self.buckets[server] = TokenBucket(self.limits_for(server)[0], self.burst)
+                if self.controller_factory is not None and server not in self.controllers:
+                    self.controllers[server] = self.controller_factory()
+            if not self.queues[server]:
+                self.order.append(server)
+            self.queues[server].append(domain)
+            self.pending += 1
+
+    def next_ready(self) -> Tuple[Optional[Tuple[str, str]], Optional[float]]:
+        """
+        Return ((domain, server), 0) for the next domain allowed to go out now.
+        Otherwise return (None, wait), where wait is the seconds until a token frees up,
+        or None if every server with work is at its concurrency cap.
+        """
+        with self.lock:
+            wait = None
+            for _ in range(len(self.order)):
+                server = self.order[0]
+                self.order.rotate(-1)
+                cap = self.cap_for(server)
+                if cap is not None and self.active[server] >= cap:
+                    continue
+                delay = self.buckets[server].try_acquire()
+                if delay:
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+                domain = self.queues[server].popleft()
+                if not self.queues[server]:
+                    self.order.remove(server)
+                self.active[server] += 1
+                self.pending -= 1
+                return (domain, server), 0.0
+            return None, wait
+
+    def release(self, server: str):
+        with self.lock:
+            self.active[server] -= 1
+
+
+_EXHAUSTED = object()
+
+
+class CheckControl:
+    """
+    Cooperative pause/cancel token shared between a caller (e.g. the GUI) and a running check.
+    While paused no new lookups, retries or DNS queries are issued (in-flight ones still finish);
+    cancel stops the check and releases its workers.
+    """
+    POLL_INTERVAL = 0.05  # Longest a running check goes without looking at the token
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.paused = False
+        self.cancelled = False
+
+    def pause(self):
+        with self.condition:
+            self.paused = True
+            self.condition.notify_all()
+
+    def resume(self):
+        with self.condition:
+            self.paused = False
+            self.condition.notify_all()
+
+    def cancel(self):
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    def sleep(self, timeout: Optional[float]):
+        """
+        Sleep up to timeout seconds, returning early if the token is paused, resumed or cancelled.
+        """
+        with self.condition:
+            self.condition.wait(timeout)
+
 
 class DomainChecker:
-    def __init__(self, max_threads: int = 10, max_retries: int = 5, base_backoff: int = 2, jitter: bool = True):
+    def __init__(self, max_threads: int = 10, max_retries: int = 5, base_backoff: int = 2, jitter: bool = True,
+                 rate_limit: Optional[float] = None, max_per_server: Optional[int] = None,
+                 cache=None, refresh_cache: bool = False, dns_prefilter=None, adaptive: Optional[str] = None,
+                 retry_delay: float = 0, use_python_whois: bool = False, timeout: float = 10.0, observer=None,
+                 retry_kinds: Iterable[ErrorKind] = RETRYABLE_KINDS, backends: Iterable[LookupBackend] = (),
+                 routes: Optional[Dict[str, Iterable[str]]] = None, cache_free: bool = True):
         self.max_threads = max_threads
         self.max_retries = max_retries
         self.base_backoff = base_backoff
         self.jitter = jitter
+        self.rate_limit = rate_limit  # Queries per second per WHOIS server, None for unlimited
+        self.max_per_server = max_per_server  # Concurrent lookups per WHOIS server, None for unlimited
+        self.cache = cache  # Optional ResultCache consulted before and updated after every lookup
+        self.refresh_cache = refresh_cache  # Ignore cached results but still store fresh ones
+        self.cache_free = cache_free  # False while a FreeVerifier re-checks frees; it caches them once verified
+        self.dns_prefilter = dns_prefilter  # Optional DnsPrefilter that marks delegated domains occupied before WHOIS
+        # None keeps max_threads/max_per_server fixed; 'global' or 'server' lets AimdControllers
+        # tune concurrency below those ceilings
+        if adaptive not in (None, 'global', 'server'):
+            raise ValueError(f"adaptive must be None, 'global' or 'server', not {adaptive!r}")
+        self.adaptive = adaptive
+        self.retry_delay = retry_delay  # Seconds before one final round for domains that still end in error, 0 to disable
+        # The in-tree client is the default; python-whois remains available for its broader parsing
+        self.use_python_whois = use_python_whois
+        self.client = WhoisClient(connect_timeout=min(5.0, timeout), read_timeout=timeout)
+        self.observer = observer  # Optional metrics.LookupObserver told about every attempt and result
+        self.retry_kinds = frozenset(retry_kinds)  # Error kinds that get retries and the retry_delay round
+        # Extra backends (cheapest first) are tried before port-43 WHOIS unless routes say otherwise
+        backends = list(backends)
+        if not any(backend.name == 'whois' for backend in backends):
+            backends.append(WhoisBackend(self.client, use_python_whois))
+        self.router = BackendRouter(backends, routes)
+
+    def make_controller(self, maximum: int) -> AimdController:
+        return AimdController(initial=min(2, maximum), maximum=maximum)
+
+    def make_scheduler(self) -> WhoisScheduler:
+        controller_factory = None
+        if self.adaptive == 'server':
+            maximum = self.max_per_server or self.max_threads
+            controller_factory = lambda: self.make_controller(maximum)
+        return WhoisScheduler(rate=self.rate_limit, max_per_server=self.max_per_server, server_for=self.router.server_for,
+                              controller_factory=controller_factory)
+
+    def backoff_delay(self, attempt: int) -> float:
+        return backoff_delay(self.base_backoff, attempt, self.jitter)
+
+    def cached_status(self, domain: str) -> Optional[str]:
+        if self.cache is None or self.refresh_cache:
+            return None
+        return self.cache.get(domain)
+
+    def cache_result(self, domain: str, status: str):
+        if self.cache is not None and (self.cache_free or status != 'free'):
+            self.cache.put(domain, status)
 
     def check_domain(self, domain: str) -> Tuple[str, str]:
+        """
+        Check a domain, answering from the result cache when possible.
+        Returns (domain, status) where status is 'free', 'occupied', or 'error: <kind>: message'
+        """
+        status, stage = self.cached_status(domain), 'cache'
+        if status is None:
+            status, stage = self.router.local_lookup(domain) or (None, None)
+        if status is not None:
+            if self.observer is not None:
+                self.observer.on_result(domain, status, stage, 0)
+            return domain, status
+        domain, status = self.lookup_domain(domain)
+        self.cache_result(domain, status)
+        return domain, status
+
+    def lookup_once(self, domain: str, trace: Optional[dict] = None) -> Tuple[str, bool]:
+        """
+        Make a single attempt through the domain's remote backends (port-43 WHOIS unless routed elsewhere).
+        Returns (status, retryable), where retryable is True when the error's kind is in retry_kinds
+        (by default resets, including error 54 on Mac, timeouts, network errors and rate-limit replies).
+        trace is passed on to the backend (python-whois records nothing in it).
+        """
+        try:
+            status = self.router.lookup(domain, trace)
+        except Exception as e:
+            status = exception_status(e)
+        return status, error_kind(status) in self.retry_kinds
+
+    def lookup_domain(self, domain: str) -> Tuple[str, str]:
         """
         Check if a domain is free or occupied with enhanced retries on connection errors,
         including specific handling for error 54 (Connection reset by peer on Mac).
-        Uses exponential backoff with optional jitter.
-        Returns (domain, status) where status is 'free', 'occupied', or 'error: message'
+        Uses exponential backoff with optional jitter, sleeping in the calling thread;
+        check_domains instead schedules retries without holding a worker.
+        Returns (domain, status) where status is 'free', 'occupied', or 'error: <kind>: message'
         """
         for attempt in range(self.max_retries):
-            try:
-                info = whois.whois(domain)
-                if info.domain_name:  # If whois returns info, it's likely occupied
-                    return domain, 'occupied'
-                else:
-                    return domain, 'free'
-            except whois.parser.PywhoisError:
-                return domain, 'free'
-            except (ConnectionResetError, socket.timeout, socket.error) as e:
-                if e.errno == 54:  # Specific handling for error 54
-                    error_msg = f'error 54: Connection reset by peer - {str(e)}'
-                else:
-                    error_msg = f'error: {str(e)}'
-                if attempt < self.max_retries - 1:
-                    backoff = self.base_backoff ** attempt
-                    if self.jitter:
-                        backoff += random.uniform(0, backoff)  # Add jitter for better distribution
-                    time.sleep(backoff)
+            status, retryable, latency, trace = self.timed_lookup(domain)
+            last = not retryable or attempt == self.max_retries - 1
+            delay = 0.0 if last else self.backoff_delay(attempt)
+            self.observe_lookup(domain, self.router.server_for(domain), attempt + 1, status, retryable, latency, trace, delay)
+            if last:
+                if self.observer is not None:
+                    self.observer.on_result(domain, status, 'whois', attempt + 1)
+                return domain, status
+            time.sleep(delay)
+        return domain, error_status(ErrorKind.OTHER, 'max retries exceeded')
+
+    def timed_lookup(self, domain: str) -> Tuple[str, bool, float, Optional[dict]]:
+        """
+        lookup_once plus its latency and, when an observer is set, its trace.
+        """
+        trace = {} if self.observer is not None else None
+        start = time.monotonic()
+        status, retryable = self.lookup_once(domain, trace)
+        return status, retryable, time.monotonic() - start, trace
+
+    def observe_lookup(self, domain: str, server: str, attempt: int, status: str, retryable: bool, latency: float,
+                       trace: Optional[dict], backoff: float):
+        if self.observer is None:
+            return
+        trace = trace or {}
+        self.observer.on_lookup(LookupEvent(domain, trace.get('server', server), attempt, status, retryable, latency,
+                                            trace.get('spans'), trace.get('bytes', 0), backoff))
+
+    def iter_stages(self, domains: Iterable[str], window: int,
+                    control: Optional[CheckControl] = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Run the stages that come before WHOIS, yielding (domain, status, stage).
+        stage is 'cache', a local backend's name (e.g. 'zone') or 'dns' for domains they answered,
+        and status and stage are None for domains that still need a remote lookup.
+        None input items pass through as None.
+        """
+        def cached(domains):
+            for domain in domains:
+                if domain is None:
+                    yield None
                     continue
-                else:
-                    return domain, error_msg
-            except Exception as e:
-                return domain, f'error: {str(e)}'
-        return domain, 'error: max retries exceeded'
+                status = self.cached_status(domain)
+                if status is not None:
+                    yield domain, status, 'cache'
+                    continue
+                local = self.router.local_lookup(domain)
+                yield (domain, *local) if local else (domain, None, None)
 
-    def check_domains(self, domains: List[str], callback: Callable[[str, str], None] = None) -> List[Tuple[str, str]]:
+        items = cached(domains)
+        if self.dns_prefilter is None:
+            return items
+        return self.dns_prefilter.iter_filter(items, window, control)
+
+    def iter_check_domains(self, domains: Iterable[str], window: Optional[int] = None,
+                           with_stage: bool = False, control: Optional[CheckControl] = None) -> Iterator[Tuple[str, ...]]:
+        """
+        Lazily check domains from any iterable (e.g. a file object), yielding (domain, status) as results complete,
+        or (domain, status, stage) with with_stage=True, where stage is 'cache', 'zone', 'dns' or 'whois'
+        ('whois' covers every remote backend, RDAP included).
+        At most window domains are held at once between the scheduler and in-flight lookups,
+        so memory stays flat regardless of input size.
+        Work is interleaved across WHOIS servers, each limited by rate_limit and max_per_server.
+        Failed attempts wait on a delay heap for their backoff instead of sleeping in a worker thread,
+        and their outcome (with success latency) drives the AIMD controllers when adaptive is set.
+        With retry_delay, domains that still end in error rejoin the same heap for one final round
+        retry_delay seconds later; they do not count against window while they wait.
+        With a CheckControl, pausing stops reading input and issuing lookups within POLL_INTERVAL
+        (in-flight results are still yielded), and cancelling returns at once without waiting for them.
+        domains may yield None to say no input is available yet (see service.CheckService): the check
+        goes on with what it holds and pulls again within POLL_INTERVAL.
+        """
+        import concurrent.futures
+        window = window or max(1000, self.max_threads * 10)
+        source = self.iter_stages(domains, window, control)
+        exhausted = False
+        scheduler = self.make_scheduler()
+        global_controller = self.make_controller(self.max_threads) if self.adaptive == 'global' else None
+        attempts: Dict[str, int] = {}  # Attempts made so far for domains that have failed at least once
+        tries = Counter()  # WHOIS attempts per domain across all rounds, for observers
+        delayed = []  # Heap of (due, seq, domain, final_round) waiting out their backoff or retry_delay
+        final_round = set()  # Domains on their post-retry_delay round
+        final_waiting = 0  # Entries in delayed that are waiting for the final round
+        seq = 0
+        in_flight = {}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_threads)
+        cancelled = False
+        try:
+            while True:
+                if control is not None and control.cancelled:
+                    cancelled = True
+                    return
+                paused = control is not None and control.paused
+                while not paused and not exhausted and scheduler.pending + len(in_flight) + len(delayed) - final_waiting < window:
+                    item = next(source, _EXHAUSTED)
+                    if item is _EXHAUSTED:
+                        exhausted = True
+                        break
+                    if item is None:
+                        break  # No input available yet; go on with what is in flight
+                    domain, status, stage = item
+                    if status is None:
+                        scheduler.add(domain)
+                        continue
+                    # Cache, local backend and DNS answers never reach the scheduler, so they cost no rate budget
+                    if stage == 'dns':
+                        self.cache_result(domain, status)
+                    if self.observer is not None:
+                        self.observer.on_result(domain, status, stage, 0)
+                    yield (domain, status, stage) if with_stage else (domain, status)
+                if exhausted and not scheduler.pending and not in_flight and not delayed:
+                    break
+
+                now = time.monotonic()
+                wait = None
+                if not paused:
+                    while delayed and delayed[0][0] <= now:
+                        _, _, domain, final = heapq.heappop(delayed)
+                        final_waiting -= final
+                        scheduler.add(domain)
+
+                    limit = global_controller.current if global_controller else self.max_threads
+                    while len(in_flight) < limit:
+                        item, wait = scheduler.next_ready()
+                        if item is None:
+                            break
+                        domain, server = item
+                        in_flight[executor.submit(self.timed_lookup, domain)] = (domain, server)
+                    if delayed:
+                        until_due = max(0.0, delayed[0][0] - now)
+                        wait = until_due if wait is None else min(wait, until_due)
+                if control is not None:
+                    wait = CheckControl.POLL_INTERVAL if wait is None else min(wait, CheckControl.POLL_INTERVAL)
+                if not in_flight:
+                    if wait is None:
+                        wait = CheckControl.POLL_INTERVAL  # Only the input is left, and it has nothing yet
+                    if control is not None:
+                        control.sleep(wait)
+                    else:
+                        time.sleep(wait)
+                    continue
+                done, _ = concurrent.futures.wait(in_flight, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    domain, server = in_flight.pop(future)
+                    scheduler.release(server)
+                    try:
+                        status, retryable, latency, trace = future.result()
+                    except Exception as e:
+                        status, retryable, latency, trace = exception_status(e), False, 0.0, None
+                    for controller in (global_controller, scheduler.controller(server)):
+                        if controller is not None:
+                            if retryable:
+                                controller.on_failure()
+                            else:
+                                controller.on_success(latency)
+                    attempt = attempts.pop(domain, 0) + 1
+                    tries[domain] += 1
+                    delay, final = None, False
+                    if retryable and attempt < self.max_retries:
+                        attempts[domain] = attempt
+                        delay = self.backoff_delay(attempt - 1)
+                    elif domain in final_round:
+                        final_round.discard(domain)
+                    elif self.retry_delay > 0 and error_kind(status) in self.retry_kinds:
+                        delay, final = self.retry_delay, True
+                    self.observe_lookup(domain, server, tries[domain], status, retryable, latency, trace, delay or 0.0)
+                    if delay is not None:
+                        if final:
+                            final_round.add(domain)
+                            final_waiting += 1
+                        seq += 1
+                        heapq.heappush(delayed, (time.monotonic() + delay, seq, domain, final))
+                        continue
+                    self.cache_result(domain, status)
+                    total_tries = tries.pop(domain)
+                    if self.observer is not None:
+                        self.observer.on_result(domain, status, 'whois', total_tries)
+                    yield (domain, status, 'whois') if with_stage else (domain, status)
+        finally:
+            # On cancel (or when the consumer stops early) in-flight lookups are abandoned, not awaited
+            cancelled = cancelled or bool(in_flight)
+            executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
+
+    def check_domains(self, domains: Iterable[str], callback: Callable[[str, str], None] = None) -> List[Tuple[str, str]]:
         """
         Check multiple domains concurrently.
         If callback is provided, it will be called for each result as it completes.
         Returns list of (domain, status)
         """
         results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            future_to_domain = {executor.submit(self.check_domain, domain): domain for domain in domains}
-            for future in concurrent.futures.as_completed(future_to_domain):
-                domain, status = future.result()
-                if callback:
-                    callback(domain, status)
-                results.append((domain, status))
+        for domain, status in self.iter_check_domains(domains):
+            if callback:
+                callback(domain, status)
+            results.append((domain, status))
         return results
 
     def check_domains_async(self, domains: List[str], result_queue: queue.Queue, progress_callback: Callable[[int, int], None] = None):
@@ -71,22 +994,12 @@ class DomainChecker:
         """
         total = len(domains)
         completed = 0
-        lock = threading.Lock()
 
-        def callback_wrapper(future):
+        def callback(domain, status):
             nonlocal completed
-            domain = future_to_domain[future]
-            try:
-                _, status = future.result()
-            except Exception as e:
-                status = f'error: {str(e)}'
             result_queue.put((domain, status))
-            with lock:
-                completed += 1
-                if progress_callback:
-                    progress_callback(completed, total)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            future_to_domain = {executor.submit(self.check_domain, domain): domain for domain in domains}
-            for future in future_to_domain:
-                future.add_done_callback(callback_wrapper)
\ No newline at end of file
+            completed += 1
+            if progress_callback:
+                progress_callback(completed, total)
+
+        self.check_domains(domains, callback=callback)
@@ -0,0 +1,129 @@
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Iterable, Iterator, Optional, Set
+
+SCHEME_RE = re.compile(r'^[a-z][a-z0-9+.-]*://')
+LABEL_RE = re.compile(r'^(?!-)[a-z0-9-]{1,63}(?<!-)$')
+
+# With exact_limit, an exact set holds at most this many domains (about 100 MB) before a Bloom filter takes over
+EXACT_DEDUPE_LIMIT = 1_000_000
+# Capacity of that Bloom filter unless one is given: about 180 MB at the default error rate
+DEFAULT_BLOOM_CAPACITY = 100_000_000
+
+
+class BloomFilter:
+    """
+    Fixed-memory set approximation for deduplicating inputs too large for a Python set.
+    Membership can be a false positive (at about error_rate once capacity items were added),
+    never a false negative.
+    """
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """
+        Add item and return True if it was (probably) present already.
+        """
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p // 8] & (1 << (p % 8)) for p in self._positions(item))
+
+
+def normalize_domain(line: str) -> Optional[str]:
+    """
+    Turn an input line into the canonical domain to query, or None if it is not a valid domain name.
+    Lowercases, strips URL schemes, paths, credentials, ports and trailing dots,
+    and converts internationalized names to punycode, so every spelling of a name maps to one key.
+    """
+    domain = line.strip().lower()
+    domain = SCHEME_RE.sub('', domain)
+    domain = re.split(r'[/?#\s]', domain, 1)[0]
+    domain = domain.rpartition('@')[2]
+    domain = domain.split(':', 1)[0].rstrip('.')
+    if not domain:
+        return None
+    if not domain.isascii():
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            return None
+    labels = domain.split('.')
+    if len(labels) < 2 or len(domain) > 253 or not all(LABEL_RE.match(label) for label in labels):
+        return None
+    tld = labels[-1]
+    if not (tld.isalpha() or tld.startswith('xn--')):
+        return None
+    return domain
+
+
+class DomainNormalizer:
+    """
+    Streaming input stage shared by cli.py and gui.py: normalizes each line and drops invalid ones
+    and repeats with O(1) checks. Duplicates are tracked in a set, whose memory grows with the input,
+    or in a BloomFilter when bloom_capacity is given, to bound memory on huge inputs. With exact_limit,
+    the set is used until it holds that many domains, then they move to a BloomFilter for bloom_capacity
+    (DEFAULT_BLOOM_CAPACITY if not given). stats counts accepted, duplicate, invalid and blank lines.
+    """
+    def __init__(self, dedupe: bool = True, bloom_capacity: Optional[int] = None, seen: Optional[Set[str]] = None,
+                 exact_limit: Optional[int] = None):
+        self.dedupe = dedupe
+        self.bloom_capacity = bloom_capacity or DEFAULT_BLOOM_CAPACITY
+        self.exact_limit = exact_limit
+        if bloom_capacity and not exact_limit:
+            self.seen = BloomFilter(bloom_capacity)
+            for domain in seen or ():
+                self.seen.add(domain)
+        else:
+            self.seen = seen if seen is not None else set()
+        self.stats = Counter()
+
+    def seen_before(self, domain: str) -> bool:
+        if isinstance(self.seen, BloomFilter):
+            return self.seen.add(domain)
+        if domain in self.seen:
+            return True
+        if self.exact_limit and len(self.seen) >= self.exact_limit:
+            bloom = BloomFilter(self.bloom_capacity)
+            for seen in self.seen:
+                bloom.add(seen)
+            self.seen = bloom
+            return bloom.add(domain)
+        self.seen.add(domain)
+        return False
+
+    def iter_domains(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if not line.strip():
+                self.stats['blank'] += 1
+                continue
+            domain = normalize_domain(line)
+            if domain is None:
+                self.stats['invalid'] += 1
+                continue
+            if self.dedupe and self.seen_before(domain):
+                self.stats['duplicate'] += 1
+                continue
+            self.stats['accepted'] += 1
+            yield domain
+
+    def summary(self) -> str:
+        return (f"{self.stats['accepted']} accepted, {self.stats['duplicate']} duplicates, "
+                f"{self.stats['invalid']} invalid lines dropped")
@@ -3,28 +3,42 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import queue
 import threading
-from domain_checker import DomainChecker
-import time
-import concurrent.futures
+from domain_checker import CheckControl, DomainChecker, is_error
+from result_cache import ResultCache
+from domain_input import DomainNormalizer
+from checkpoint import load_journal, save_session
+from collections import Counter
+
+MAX_RESULTS_PER_TICK = 5000  # Cap on queue items applied per 50ms tick, so the UI stays responsive
+
+
+def status_category(status):
+    if status in ("free", "occupied"):
+        return status
+    if is_error(status):
+        return "error"
+    return "other"  # Pending, Cancelled
 
 class DomainCheckerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Domain Availability Checker by Keklick1337")
-        self.root.geometry("800x600")
-        self.root.minsize(800, 600)  # Set minimum window size to prevent elements from hiding on resize
+        self.root.geometry("1000x600")
+        self.root.minsize(1000, 600)  # Set minimum window size to prevent elements from hiding on resize
         self.result_queue = queue.Queue()
         self.domains = []
         self.running = False
-        self.paused = False
-        self.cancelled = False
-        self.domain_to_item = {}  # Map domain to Treeview item ID
+        self.control = CheckControl()  # Pause/cancel token of the current check; a fresh one per start_check
+        self.check_thread = None  # Thread running the current (or last) check
         self.results = {}  # Domain to status
-        self.executor = None  # For pausing/resuming
-        self.future_to_domain = {}
+        self.counts = Counter()  # Status category to count, kept up to date by set_status
+        self.offset = 0  # Index in self.domains of the first visible table row
+        self.row_items = []  # The fixed set of Treeview rows reused for whatever is visible
         self.completed = 0
         self.total = 0
         self.auto_retry_delay = 60  # Seconds before auto-retrying errors
+        self.cache = ResultCache()  # Shared with cli.py, so results survive between runs
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Main frame
         self.main_frame = ttk.Frame(root, padding="10")
@@ -55,6 +69,12 @@ class DomainCheckerGUI:
         self.clear_button = ttk.Button(self.buttons_frame, text="Clear", command=self.clear_table)
         self.clear_button.pack(side=tk.LEFT, padx=5)
 
+        self.save_session_button = ttk.Button(self.buttons_frame, text="Save Session", command=self.save_session)
+        self.save_session_button.pack(side=tk.LEFT, padx=5)
+
+        self.load_session_button = ttk.Button(self.buttons_frame, text="Load Session", command=self.load_session)
+        self.load_session_button.pack(side=tk.LEFT, padx=5)
+
         # Progress frame
         self.progress_frame = ttk.Frame(self.main_frame)
         self.progress_frame.pack(fill=tk.X, pady=10)
@@ -92,10 +112,10 @@ class DomainCheckerGUI:
         self.tree.column("Status", width=200)
         self.tree.grid(row=0, column=0, sticky="nsew")
 
-        # Vertical scrollbar
-        scrollbar_y = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar_y.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar_y.set)
+        # Vertical scrollbar drives self.offset: the table is virtual and only holds the visible rows
+        self.scrollbar_y = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.on_yscroll)
+        self.scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.tree.bind("<Configure>", lambda event: self.render_rows())
 
         # Horizontal scrollbar
         scrollbar_x = ttk.Scrollbar(self.tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
@@ -145,42 +165,98 @@ class DomainCheckerGUI:
         self.retry_delay_entry = ttk.Entry(self.bottom_frame, textvariable=self.retry_delay_var, width=5)
         self.retry_delay_entry.pack(side=tk.LEFT, padx=5)
 
+    def on_close(self):
+        self.control.cancel()
+        # The check thread still uses the cache until it sees the cancel, which takes at most POLL_INTERVAL
+        if self.check_thread is not None:
+            self.check_thread.join(timeout=5)
+        if self.check_thread is None or not self.check_thread.is_alive():
+            self.cache.close()
+        self.root.destroy()
+
     def on_mouse_wheel(self, event):
-        self.tree.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        # Windows reports multiples of 120 per notch, Mac trackpads small raw deltas
+        step = int(-1 * (event.delta / 120)) if abs(event.delta) >= 120 else -event.delta
+        self.scroll_to(self.offset + step)
+        return "break"
 
     def on_shift_mouse_wheel(self, event):
         self.tree.xview_scroll(int(-1 * (event.delta / 120)), "units")
 
+    def page_size(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        header_height = 25
+        return max(1, (self.tree.winfo_height() - header_height) // row_height)
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, len(self.domains) - self.page_size()))
+        self.render_rows()
+
+    def on_yscroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.domains)))
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.page_size())
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    def render_rows(self):
+        """
+        Show self.domains[offset:offset + page_size] in the fixed set of Treeview rows.
+        Cost depends only on the window height, never on the number of domains.
+        """
+        size = self.page_size()
+        while len(self.row_items) < size:
+            self.row_items.append(self.tree.insert("", tk.END, values=("", "")))
+        while len(self.row_items) > size:
+            self.tree.delete(self.row_items.pop())
+        self.offset = max(0, min(self.offset, len(self.domains) - size))
+        for i, item in enumerate(self.row_items):
+            index = self.offset + i
+            if index < len(self.domains):
+                domain = self.domains[index]
+                self.tree.item(item, values=(domain, self.results.get(domain, "")))
+            else:
+                self.tree.item(item, values=("", ""))
+        if self.domains:
+            self.scrollbar_y.set(self.offset / len(self.domains), min(1.0, (self.offset + size) / len(self.domains)))
+        else:
+            self.scrollbar_y.set(0.0, 1.0)
+
+    def set_status(self, domain, status):
+        old = self.results.get(domain)
+        if old is not None:
+            self.counts[status_category(old)] -= 1
+        self.results[domain] = status
+        self.counts[status_category(status)] += 1
+
     def load_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt")])
         if file_path:
-            with open(file_path, 'r') as f:
-                domains_text = f.read()
-            new_domains = [d.strip() for d in domains_text.split('\n') if d.strip()]
-            added_count = len(new_domains)
-            self.domains.extend([d for d in new_domains if d not in self.domains])
-            duplicates = added_count - (len(self.domains) - (added_count - len(new_domains)))
-            if duplicates > 0:
-                messagebox.showinfo("Duplicates", f"{duplicates} duplicate domains were ignored.")
+            # The normalizer's seen-set starts with the domains already loaded, so checks are O(1)
+            normalizer = DomainNormalizer(seen=set(self.domains))
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                self.domains.extend(normalizer.iter_domains(f))
+            duplicates = normalizer.stats['duplicate']
+            invalid = normalizer.stats['invalid']
+            if duplicates > 0 or invalid > 0:
+                messagebox.showinfo("Duplicates", f"{duplicates} duplicate domains and {invalid} invalid lines were ignored.")
             self.populate_table()
 
     def populate_table(self):
-        # Clear existing
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.domain_to_item = {}
-        for domain in self.domains:
-            item = self.tree.insert("", tk.END, values=(domain, "Pending"))
-            self.domain_to_item[domain] = item
-            self.results[domain] = "Pending"
+        self.results = {domain: "Pending" for domain in self.domains}
+        self.counts = Counter(other=len(self.results))
+        self.offset = 0
+        self.render_rows()
         self.progress_label.config(text=f"0/{len(self.domains)} domains checked")
         self.update_counters()
 
     def clear_table(self):
         self.domains = []
         self.results = {}
-        self.domain_to_item = {}
-        self.tree.delete(*self.tree.get_children())
+        self.counts = Counter()
+        self.offset = 0
+        self.render_rows()
         self.status_label.config(text="Ready")
         self.progress["value"] = 0
         self.progress_label.config(text="0/0 domains checked")
@@ -188,7 +264,7 @@ class DomainCheckerGUI:
         self.recheck_button.config(state=tk.DISABLED)
         self.update_counters()
 
-    def start_check(self, domains=None):
+    def start_check(self, domains=None, refresh=False):
         if self.running:
             messagebox.showwarning("Warning", "Checking is already in progress.")
             return
@@ -201,9 +277,9 @@ class DomainCheckerGUI:
 
         # Set pending for the domains being checked
         for domain in check_domains:
-            if domain in self.domain_to_item:
-                self.tree.item(self.domain_to_item[domain], values=(domain, "Pending"))
-                self.results[domain] = "Pending"
+            if domain in self.results:
+                self.set_status(domain, "Pending")
+        self.render_rows()
 
         try:
             max_threads = int(self.threads_var.get())
@@ -219,25 +295,60 @@ class DomainCheckerGUI:
             self.auto_retry_delay = 60
             messagebox.showwarning("Warning", "Invalid input values, using defaults.")
 
-        self.checker = DomainChecker(max_threads=max_threads, max_retries=max_retries, base_backoff=base_backoff, jitter=jitter)
+        # Rechecks pass refresh=True so they re-query instead of returning cached errors
+        self.checker = DomainChecker(max_threads=max_threads, max_retries=max_retries, base_backoff=base_backoff, jitter=jitter,
+                                     cache=self.cache, refresh_cache=refresh, retry_delay=self.auto_retry_delay)
 
         self.progress["value"] = 0
         self.progress["maximum"] = len(check_domains)
         self.progress_label.config(text=f"0/{len(check_domains)} domains checked")
         self.status_label.config(text="Checking...")
         self.running = True
-        self.paused = False
-        self.cancelled = False
+        self.control = CheckControl()
         self.completed = 0
         self.total = len(check_domains)
         self.disable_buttons_during_check()
         self.control_button.config(state=tk.NORMAL, text="Pause")
         self.cancel_button.config(state=tk.NORMAL)
 
-        threading.Thread(target=self.run_check, args=(check_domains,), daemon=True).start()
-        self.root.after(50, self.process_queue)  # Faster polling for real-time feel
+        self.check_thread = threading.Thread(target=self.run_check, args=(check_domains, self.control), daemon=True)
+        self.check_thread.start()
+        self.root.after(50, self.process_queue, self.control)  # Faster polling for real-time feel
+
+    def save_session(self):
+        if not self.results:
+            messagebox.showinfo("Info", "Nothing to save.")
+            return
+        session_file = filedialog.asksaveasfilename(defaultextension=".journal", title="Save Session", initialfile="session.journal")
+        if not session_file:
+            return
+        save_session(session_file, self.results)
+        messagebox.showinfo("Success", f"Session with {len(self.results)} domains saved.")
+
+    def load_session(self):
+        session_file = filedialog.askopenfilename(filetypes=[("Session files", "*.journal"), ("All files", "*")])
+        if not session_file:
+            return
+        entries = load_journal(session_file)
+        if not entries:
+            messagebox.showerror("Error", "No domains found in session file.")
+            return
+        self.domains = list(entries)
+        self.results = {}
+        self.populate_table()
+        for domain, status in entries.items():
+            self.set_status(domain, status)
+        self.render_rows()
+        self.update_counters()
+        self.enable_buttons_after_check()
+        remaining = [domain for domain, status in entries.items() if status in ("Pending", "Cancelled")]
+        self.status_label.config(text=f"Session loaded: {len(entries) - len(remaining)} checked, {len(remaining)} remaining.")
+        if remaining and messagebox.askyesno("Resume", f"Resume checking {len(remaining)} remaining domains?"):
+            self.start_check(domains=remaining)
 
     def disable_buttons_during_check(self):
+        # Save Session stays enabled so a running check can be snapshotted before shutting down
+        self.load_session_button.config(state=tk.DISABLED)
         self.load_button.config(state=tk.DISABLED)
         self.check_button.config(state=tk.DISABLED)
         self.recheck_button.config(state=tk.DISABLED)
@@ -245,6 +356,8 @@ class DomainCheckerGUI:
         self.clear_button.config(state=tk.DISABLED)
 
     def enable_buttons_after_check(self):
+        self.save_session_button.config(state=tk.NORMAL)
+        self.load_session_button.config(state=tk.NORMAL)
         self.load_button.config(state=tk.NORMAL)
         self.check_button.config(state=tk.NORMAL)
         self.clear_button.config(state=tk.NORMAL)
@@ -252,109 +365,97 @@ class DomainCheckerGUI:
         self.cancel_button.config(state=tk.DISABLED)
         self.save_button.config(state=tk.NORMAL)
         # Enable recheck if there are errors
-        has_errors = any(status.startswith('error:') for status in self.results.values())
-        if has_errors:
+        if self.counts["error"] > 0:
             self.recheck_button.config(state=tk.NORMAL)
         else:
             self.recheck_button.config(state=tk.DISABLED)
 
-    def run_check(self, check_domains):
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.checker.max_threads)
-        self.future_to_domain = {self.executor.submit(self.checker.check_domain, domain): domain for domain in check_domains}
-        for future in self.future_to_domain:
-            future.add_done_callback(self.callback_wrapper)
-
-    def callback_wrapper(self, future):
-        if self.cancelled or not self.running:
-            return
-        while self.paused:
-            time.sleep(0.1)
-            if self.cancelled or not self.running:
-                return
-        domain = self.future_to_domain[future]
+    def run_check(self, check_domains, control):
+        # The checker itself honours pause and cancel, so this loop never blocks on them.
+        # Results are tagged with their run's token: a cancelled run may still queue a few.
+        # A crash is queued as a None domain with the error, so the UI stops waiting for results
         try:
-            _, status = future.result()
+            for domain, status in self.checker.iter_check_domains(check_domains, control=control):
+                self.result_queue.put((control, domain, status))
         except Exception as e:
-            status = f'error: {str(e)}'
-        self.result_queue.put((domain, status))
+            self.result_queue.put((control, None, f"{type(e).__name__}: {e}"))
 
-    def process_queue(self):
-        updated = False
+    def process_queue(self, control):
+        if control is not self.control:
+            return  # A newer check has its own polling loop
         count = 0
+        failure = None
         try:
-            while True:
-                domain, status = self.result_queue.get_nowait()
-                if domain in self.domain_to_item:
-                    item = self.domain_to_item[domain]
-                    self.tree.item(item, values=(domain, status))
-                    self.results[domain] = status
-                    updated = True
+            # Bounded drain: a backlog is spread over several ticks instead of freezing the UI
+            while count < MAX_RESULTS_PER_TICK:
+                owner, domain, status = self.result_queue.get_nowait()
+                if owner is control and domain is None:
+                    failure = status
+                    break
+                if owner is control and domain in self.results:
+                    self.set_status(domain, status)
                     count += 1
         except queue.Empty:
             pass
 
-        if updated:
+        if count:
             self.completed += count
             self.progress.config(value=self.completed)
             self.progress_label.config(text=f"{self.completed}/{self.total} domains checked")
-            self.tree.update_idletasks()
+            self.render_rows()
             self.update_counters()
 
-        if self.completed < self.total and not self.cancelled:
-            self.root.after(50, self.process_queue)
-        elif not self.cancelled:
+        if failure is not None:
+            self.fail_check(failure)
+        elif self.completed < self.total and not control.cancelled:
+            self.root.after(50, self.process_queue, control)
+        elif not control.cancelled:
             self.finish_check()
 
     def update_counters(self):
-        free = sum(1 for s in self.results.values() if s == "free")
-        occupied = sum(1 for s in self.results.values() if s == "occupied")
-        errors = sum(1 for s in self.results.values() if s.startswith("error:"))
-        self.free_label.config(text=f"Free: {free}")
-        self.occupied_label.config(text=f"Occupied: {occupied}")
-        self.errors_label.config(text=f"Errors: {errors}")
+        self.free_label.config(text=f"Free: {self.counts['free']}")
+        self.occupied_label.config(text=f"Occupied: {self.counts['occupied']}")
+        self.errors_label.config(text=f"Errors: {self.counts['error']}")
 
     def finish_check(self):
-        # Auto-retry errors if delay > 0 and there are errors
-        error_domains = [domain for domain, status in self.results.items() if status.startswith('error:')]
-        if self.auto_retry_delay > 0 and error_domains:
-            self.status_label.config(text=f"Found {len(error_domains)} errors. Retrying after {self.auto_retry_delay} seconds...")
-            self.root.after(self.auto_retry_delay * 1000, lambda: self.start_check(error_domains))
-        else:
-            self.status_label.config(text="Checking complete.")
-            self.running = False
-            self.enable_buttons_after_check()
+        # Errors already had their auto-retry round inside the checker
+        self.status_label.config(text="Checking complete.")
+        self.running = False
+        self.enable_buttons_after_check()
 
     def toggle_pause_resume(self):
-        if self.paused:
-            self.paused = False
+        if self.control.paused:
+            self.control.resume()
             self.control_button.config(text="Pause")
             self.status_label.config(text="Checking...")
         else:
-            self.paused = True
+            self.control.pause()
             self.control_button.config(text="Resume")
             self.status_label.config(text="Paused")
 
     def cancel_check(self):
-        self.cancelled = True
+        self.control.cancel()
         self.running = False
-        if self.executor:
-            self.executor.shutdown(wait=False, cancel_futures=True)
         self.status_label.config(text="Cancelled.")
         self.enable_buttons_after_check()
         # Mark remaining as cancelled
         pending_domains = [d for d, s in self.results.items() if s == "Pending"]
         for domain in pending_domains:
-            if domain in self.domain_to_item:
-                self.tree.item(self.domain_to_item[domain], values=(domain, "Cancelled"))
-                self.results[domain] = "Cancelled"
+            self.set_status(domain, "Cancelled")
+        self.render_rows()
         self.update_counters()
 
+    def fail_check(self, message):
+        self.cancel_check()
+        self.status_label.config(text="Check failed.")
+        messagebox.showerror("Error", f"Checking stopped: {message}")
+
     def recheck_errors(self):
-        error_domains = [domain for domain, status in self.results.items() if status.startswith('error:')]
+        error_domains = [domain for domain, status in self.results.items() if is_error(status)]
         if not error_domains:
             messagebox.showinfo("Info", "No errors to recheck.")
             return
-        self.start_check(domains=error_domains)
+        self.start_check(domains=error_domains, refresh=True)
 
     def save_results(self):
         free_file = filedialog.asksaveasfilename(defaultextension=".txt", title="Save Free Domains", initialfile="free_domains.txt")
@@ -377,7 +478,7 @@ class DomainCheckerGUI:
                     ff.write(f"{domain}\n")
                 elif status == 'occupied':
                     fo.write(f"{domain}\n")
-                elif status.startswith('error:') or status == "Cancelled":
+                elif is_error(status) or status == "Cancelled":
                     fe.write(f"{domain}\t{status}\n")
 
         messagebox.showinfo("Success", "Results saved successfully.")
@@ -0,0 +1,221 @@
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Optional, TextIO
+
+# Upper bounds (seconds) of the lookup latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+# Phases a WhoisClient attempt is split into; see WhoisClient.lookup
+SPANS = ('referral', 'resolve', 'connect', 'read', 'parse')
+
+
+class LookupEvent:
+    """
+    One WHOIS attempt as seen by the dispatcher.
+    spans maps phase names from SPANS to seconds (empty with python-whois), backoff is the delay
+    scheduled before the next attempt, 0 if this attempt settled the domain.
+    """
+    def __init__(self, domain: str, server: str, attempt: int, status: str, retryable: bool, latency: float,
+                 spans: Optional[Dict[str, float]] = None, bytes_received: int = 0, backoff: float = 0.0):
+        self.domain = domain
+        self.server = server
+        self.attempt = attempt
+        self.status = status
+        self.retryable = retryable
+        self.latency = latency
+        self.spans = spans or {}
+        self.bytes_received = bytes_received
+        self.backoff = backoff
+        self.finished_at = time.time()
+
+    def __repr__(self):
+        return (f"LookupEvent({self.domain!r}, server={self.server!r}, attempt={self.attempt}, "
+                f"status={self.status!r}, latency={self.latency:.3f})")
+
+
+class LookupObserver:
+    """
+    Base class for DomainChecker observers; override the hooks you need.
+    Hooks are called from the dispatcher thread, one at a time, and should return quickly.
+    """
+    def on_lookup(self, event: LookupEvent):
+        """
+        Called after every WHOIS attempt, including ones that will be retried.
+        """
+
+    def on_result(self, domain: str, status: str, stage: str, attempts: int):
+        """
+        Called once per domain with its final status, the stage that decided it
+        ('cache', 'zone', 'dns' or 'whois') and the number of WHOIS attempts it took.
+        """
+
+
+class ObserverGroup(LookupObserver):
+    """
+    Forwards every hook to each of several observers, in order.
+    """
+    def __init__(self, *observers: LookupObserver):
+        self.observers = observers
+
+    def on_lookup(self, event: LookupEvent):
+        for observer in self.observers:
+            observer.on_lookup(event)
+
+    def on_result(self, domain: str, status: str, stage: str, attempts: int):
+        for observer in self.observers:
+            observer.on_result(domain, status, stage, attempts)
+
+
+class MetricsCollector(LookupObserver):
+    """
+    Observer that aggregates lookups per WHOIS server and phase, for a Prometheus text
+    endpoint (render_prometheus, serve_metrics) or a periodic stats line (stats_line, StatsReporter).
+    Safe to read from other threads while a check is running.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.results = Counter()  # (stage, status category) -> count
+        self.lookups = Counter()  # (server, outcome) -> count; outcome is 'ok', 'retry' or 'error'
+        self.latency_sum = Counter()  # server -> seconds
+        self.latency_buckets: Dict[str, list] = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.span_sum = Counter()  # span -> seconds
+        self.span_count = Counter()
+        self.bytes_received = Counter()  # server -> bytes
+        self.backoff_seconds = 0.0
+
+    def on_lookup(self, event: LookupEvent):
+        if event.retryable and event.backoff:
+            outcome = 'retry'
+        elif event.status not in ('free', 'occupied'):
+            outcome = 'error'
+        else:
+            outcome = 'ok'
+        with self.lock:
+            self.lookups[event.server, outcome] += 1
+            self.latency_sum[event.server] += event.latency
+            buckets = self.latency_buckets[event.server]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if event.latency <= bound:
+                    buckets[i] += 1
+            for span, seconds in event.spans.items():
+                self.span_sum[span] += seconds
+                self.span_count[span] += 1
+            self.bytes_received[event.server] += event.bytes_received
+            self.backoff_seconds += event.backoff
+
+    def on_result(self, domain: str, status: str, stage: str, attempts: int):
+        category = status if status in ('free', 'occupied') else 'error'
+        with self.lock:
+            self.results[stage, category] += 1
+
+    def render_prometheus(self) -> str:
+        """
+        Current metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self.lock:
+            metric('domain_checker_results_total', 'counter', 'Domains finished, by deciding stage and status.',
+                   [({'stage': stage, 'status': status}, count) for (stage, status), count in sorted(self.results.items())])
+            metric('domain_checker_lookups_total', 'counter', 'WHOIS attempts, by server and outcome.',
+                   [({'server': server, 'outcome': outcome}, count) for (server, outcome), count in sorted(self.lookups.items())])
+            lines.append("# HELP domain_checker_lookup_seconds WHOIS attempt latency, by server.")
+            lines.append("# TYPE domain_checker_lookup_seconds histogram")
+            for server, buckets in sorted(self.latency_buckets.items()):
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    le = '+Inf' if bound == float('inf') else bound
+                    lines.append(f'domain_checker_lookup_seconds_bucket{{server="{server}",le="{le}"}} {count}')
+                lines.append(f'domain_checker_lookup_seconds_sum{{server="{server}"}} {self.latency_sum[server]:.6f}')
+                lines.append(f'domain_checker_lookup_seconds_count{{server="{server}"}} {buckets[-1]}')
+            metric('domain_checker_span_seconds_total', 'counter', 'Time spent in each phase of WHOIS attempts.',
+                   [({'span': span}, f'{self.span_sum[span]:.6f}') for span in SPANS if self.span_count[span]])
+            metric('domain_checker_bytes_received_total', 'counter', 'WHOIS response bytes, by server.',
+                   [({'server': server}, count) for server, count in sorted(self.bytes_received.items())])
+            metric('domain_checker_backoff_seconds_total', 'counter', 'Backoff scheduled before retries.',
+                   [({}, f'{self.backoff_seconds:.3f}')])
+        return '\n'.join(lines) + '\n'
+
+    def stats_line(self) -> str:
+        """
+        One-line summary: results and rate, attempts, retries and their backoff, bytes, mean phase times
+        and the slowest server.
+        """
+        with self.lock:
+            finished = sum(self.results.values())
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            attempts = sum(self.lookups.values())
+            retries = sum(count for (_, outcome), count in self.lookups.items() if outcome == 'retry')
+            spans = ' '.join(f"{span} {self.span_sum[span] / self.span_count[span] * 1000:.0f}ms"
+                             for span in SPANS if self.span_count[span])
+            counts = Counter()
+            for (server, _), count in self.lookups.items():
+                counts[server] += count
+            slowest = max(counts, key=lambda server: self.latency_sum[server] / counts[server], default=None)
+            line = (f"[stats] {finished} done ({finished / elapsed:.1f}/s), {attempts} lookups, {retries} retries "
+                    f"({self.backoff_seconds:.0f}s backoff), {sum(self.bytes_received.values()) / 1024:.0f} KiB")
+            if spans:
+                line += f", mean {spans}"
+            if slowest is not None:
+                line += f", slowest {slowest} ({self.latency_sum[slowest] / counts[slowest] * 1000:.0f}ms avg)"
+        return line
+
+
+def serve_metrics(collector: MetricsCollector, port: int, host: str = '127.0.0.1') -> 'ThreadingHTTPServer':
+    """
+    Serve collector.render_prometheus() at http://host:port/metrics from a daemon thread.
+    Call shutdown() on the returned server to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed with --metrics-port
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = collector.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes would otherwise flood stderr
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StatsReporter:
+    """
+    Daemon thread writing collector.stats_line() to stream every interval seconds until stop().
+    """
+    def __init__(self, collector: MetricsCollector, interval: float, stream: TextIO = sys.stderr):
+        self.collector = collector
+        self.interval = interval
+        self.stream = stream
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            print(self.collector.stats_line(), file=self.stream, flush=True)
+
+    def start(self) -> 'StatsReporter':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
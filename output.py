@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, TextIO
+
+from domain_checker import error_kind
+from metrics import LookupEvent, LookupObserver
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('domain', 'status', 'error_class', 'server', 'attempts', 'latency', 'checked_at')
+
+
+class ResultTracker(LookupObserver):
+    """
+    Observer that remembers the server, attempt count and total lookup latency of each domain
+    until record() turns its final status into an output row.
+    Only domains between their first attempt and record() are held.
+    """
+    def __init__(self):
+        self.details: Dict[str, list] = {}  # domain -> [server, attempts, latency]
+
+    def on_lookup(self, event: LookupEvent):
+        detail = self.details.setdefault(event.domain, [None, 0, 0.0])
+        detail[0] = event.server
+        detail[1] += 1  # One event per attempt, including verify.FreeVerifier's
+        detail[2] += event.latency
+
+    def record(self, domain: str, status: str) -> dict:
+        """
+        Build the output row for a finished domain. server is None and attempts 0 when no WHOIS
+        lookup was observed (cache and DNS answers, results from --workers processes).
+        """
+        server, attempts, latency = self.details.pop(domain, (None, 0, 0.0))
+        kind = error_kind(status)
+        return {
+            'domain': domain,
+            'status': status,
+            'error_class': kind.value if kind else None,
+            'server': server,
+            'attempts': attempts,
+            'latency': round(latency, 3),
+            'checked_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+
+
+class ResultWriter:
+    """
+    Streams result rows as JSON Lines or CSV (with a header row). Rows are buffered and written
+    in batches of batch_size, or after flush_interval seconds, so slow runs still show progress.
+    close() writes whatever is left; the stream itself is left open.
+    """
+    def __init__(self, stream: TextIO, fmt: str = 'jsonl', batch_size: int = 1000, flush_interval: float = 1.0):
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {', '.join(FORMATS)}, not {fmt!r}")
+        self.stream = stream
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = io.StringIO()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.csv = csv.DictWriter(self.buffer, fieldnames=FIELDS, lineterminator='\n') if fmt == 'csv' else None
+        if self.csv is not None:
+            self.csv.writeheader()
+            self.flush()
+
+    def write(self, row: dict):
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.buffer.write(json.dumps(row, separators=(',', ':')) + '\n')
+        self.pending += 1
+        if self.pending >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.stream.write(self.buffer.getvalue())
+        self.stream.flush()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
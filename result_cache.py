@@ -0,0 +1,144 @@
+import threading
+import time
+from typing import Optional
+
+DEFAULT_CACHE_PATH = 'domain_cache.sqlite3'
+DEFAULT_TTL_OCCUPIED = 7 * 24 * 3600
+DEFAULT_TTL_FREE = 24 * 3600
+DEFAULT_TTL_ERROR = 0
+DEFAULT_MAX_ENTRIES = 5_000_000
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache of (domain, status) results shared by cli.py and gui.py.
+    Occupied, free and error results expire after their own TTL (0 disables caching that kind),
+    and the least recently used entries are evicted once max_entries is exceeded.
+    Writes are committed in batches of commit_every; call close() (or use as a context manager) to flush.
+    The row count is kept as entries are added and evicted, so a commit only scans the table when the
+    count passes max_entries; it is then recounted, which also picks up rows other processes added.
+    Batched commits keep a write transaction open, so only one process should write: others open
+    the cache with read_only=True (e.g. sharded workers), and neither store results nor record reads.
+    """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_occupied: float = DEFAULT_TTL_OCCUPIED,
+                 ttl_free: float = DEFAULT_TTL_FREE, ttl_error: float = DEFAULT_TTL_ERROR,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, commit_every: int = 1000, read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self.ttl_occupied = ttl_occupied
+        self.ttl_free = ttl_free
+        self.ttl_error = ttl_error
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        self.lock = threading.Lock()
+        import sqlite3  # Deferred so importing the TTL defaults (cli.py) stays cheap
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if read_only:
+            # The writer creates the schema; reads in WAL mode never wait for its open transaction
+            self.conn.execute("PRAGMA query_only=ON")
+            self.count = 0
+            return
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "domain TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "checked_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_expires ON results (expires_at)")
+        self.conn.commit()
+        self.count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def ttl_for(self, status: str) -> float:
+        if status == 'occupied':
+            return self.ttl_occupied
+        if status == 'free':
+            return self.ttl_free
+        return self.ttl_error
+
+    def get(self, domain: str) -> Optional[str]:
+        """
+        Return the cached status for domain, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status FROM results WHERE domain = ? AND expires_at > ?", (domain, now)
+            ).fetchone()
+            if row is None:
+                return None
+            if not self.read_only:
+                self.conn.execute("UPDATE results SET accessed_at = ? WHERE domain = ?", (now, domain))
+                self._wrote()
+        return row[0]
+
+    def __contains__(self, domain: str) -> bool:
+        """
+        Whether domain has an unexpired result. Unlike get(), this does not count as a use for eviction.
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM results WHERE domain = ? AND expires_at > ?", (domain, time.time())
+            ).fetchone() is not None
+
+    def put(self, domain: str, status: str):
+        ttl = self.ttl_for(status)
+        if ttl <= 0 or self.read_only:
+            return
+        now = time.time()
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM results WHERE domain = ?", (domain,)).fetchone() is None:
+                self.count += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (domain, status, checked_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (domain, status, now, now + ttl, now),
+            )
+            self._wrote()
+
+    def _wrote(self):
+        # Caller holds self.lock
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self._evict()
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def _evict(self):
+        # Caller holds self.lock. Both deletes walk an index, so they cost only the rows they remove
+        self.count -= self.conn.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),)).rowcount
+        if self.count <= self.max_entries:
+            return
+        self.count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self.count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM results WHERE domain IN "
+                "(SELECT domain FROM results ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.count -= excess
+
+    def flush(self):
+        if self.read_only:
+            return
+        with self.lock:
+            self._evict()
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,197 @@
+import json
+import os
+import queue
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from domain_checker import CheckControl, DomainChecker, ErrorKind, error_kind, error_status
+from domain_input import normalize_domain
+from metrics import MetricsCollector
+
+INVALID_DOMAIN = error_status(ErrorKind.PARSE, 'invalid domain name')
+
+
+class CheckRequest:
+    """
+    One client's batch of domains; iterate it for (domain, status, stage) as each result arrives.
+    """
+    def __init__(self, domains: List[str]):
+        self.remaining = len(domains)
+        self.results = queue.Queue()
+
+    def deliver(self, domain: str, status: str, stage: str):
+        self.results.put((domain, status, stage))
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        while self.remaining:
+            yield self.results.get()
+            self.remaining -= 1
+
+
+class CheckService:
+    """
+    Long-running front end for one DomainChecker shared by many clients. All requests feed a single
+    iter_check_domains stream, so they share its scheduler, rate limits, adaptive controllers and cache.
+    A domain requested by several clients while in flight is looked up once and delivered to each.
+    """
+    def __init__(self, checker: DomainChecker, window: Optional[int] = None):
+        self.checker = checker
+        self.window = window
+        self.inbox = queue.Queue(maxsize=window or max(1000, checker.max_threads * 10))
+        self.waiting: Dict[str, List[CheckRequest]] = {}
+        self.lock = threading.Lock()
+        self.control = CheckControl()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.error: Optional[BaseException] = None
+
+    def feed(self) -> Iterator[Optional[str]]:
+        # Never blocks: None tells the checker to carry on with its lookups and ask again shortly
+        while True:
+            try:
+                domain = self.inbox.get_nowait()
+            except queue.Empty:
+                yield None
+                continue
+            yield domain
+
+    def run(self):
+        try:
+            for domain, status, stage in self.checker.iter_check_domains(self.feed(), window=self.window,
+                                                                         with_stage=True, control=self.control):
+                with self.lock:
+                    requests = self.waiting.pop(domain, ())
+                for request in requests:
+                    request.deliver(domain, status, stage)
+        except BaseException as e:
+            self.error = e
+            raise
+
+    def start(self) -> 'CheckService':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.control.cancel()
+        self.thread.join()
+
+    def submit(self, domains: Iterable[str]) -> CheckRequest:
+        """
+        Queue domains (normalized; invalid ones are answered at once) and return their CheckRequest.
+        Blocks while the shared input is full, so huge batches apply backpressure instead of piling up.
+        """
+        domains = list(domains)
+        request = CheckRequest(domains)
+        for raw in domains:
+            domain = normalize_domain(raw)
+            if domain is None:
+                request.deliver(raw, INVALID_DOMAIN, 'input')
+                continue
+            with self.lock:
+                requests = self.waiting.setdefault(domain, [])
+                requests.append(request)
+                queued = len(requests) > 1
+            if not queued:
+                self.inbox.put(domain)
+        return request
+
+
+def result_row(domain: str, status: str, stage: str) -> dict:
+    kind = error_kind(status)
+    return {'domain': domain, 'status': status, 'stage': stage, 'error_class': kind.value if kind else None}
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/JSON API of a CheckService:
+    GET /check?domain=a.com&domain=b.org or POST /check with {"domains": [...]} streams one JSON
+    object per line as results complete; GET /health reports queue sizes, and GET /metrics serves
+    Prometheus text when the checker has a MetricsCollector observer.
+    """
+    service: CheckService = None  # Set on the subclass made by make_server
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/check':
+            self.stream(parse_qs(url.query).get('domain', []))
+        elif url.path == '/health':
+            self.send_json({'ok': self.service.error is None and self.service.thread.is_alive(),
+                            'queued': self.service.inbox.qsize(), 'waiting': len(self.service.waiting)})
+        elif url.path == '/metrics' and isinstance(self.service.checker.observer, MetricsCollector):
+            body = self.service.checker.observer.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/check':
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            domains = body['domains'] if isinstance(body, dict) else body
+            if isinstance(domains, str) or not all(isinstance(domain, str) for domain in domains):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            self.send_error(400, 'expected {"domains": ["example.com", ...]}')
+            return
+        self.stream(domains)
+
+    def stream(self, domains: List[str]):
+        if not domains:
+            self.send_error(400, 'no domains given')
+            return
+        request = self.service.submit(domains)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            for domain, status, stage in request:
+                self.wfile.write((json.dumps(result_row(domain, status, stage)) + '\n').encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client went away; its lookups still finish and warm the cache
+
+    def send_json(self, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def make_server(service: CheckService, host: str = '127.0.0.1', port: int = 8043,
+                unix_socket: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    Build the HTTP server for service on host:port, or on a Unix socket path instead.
+    Call serve_forever() on it; bulk requests stream their results while they are still being checked.
+    """
+    handler = type('BoundServiceHandler', (ServiceHandler,), {'service': service})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
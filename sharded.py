@@ -0,0 +1,190 @@
+import math
+import queue
+import threading
+import time
+import zlib
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from domain_checker import DomainChecker, whois_server_for
+
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.2
+_DONE = '__done__'
+
+
+def build_checker(checker_kwargs: dict, cache_kwargs: Optional[dict] = None, dns_kwargs: Optional[dict] = None,
+                  backend_kwargs: Optional[dict] = None) -> DomainChecker:
+    """
+    Build a DomainChecker (with its cache, DNS pre-filter and lookup backends) from plain, picklable
+    settings, so the same configuration can be recreated inside each worker process.
+    Optional stages are imported only when configured, which keeps CLI startup short.
+    """
+    cache = dns_prefilter = None
+    backends = ()
+    if cache_kwargs is not None:
+        from result_cache import ResultCache
+        cache = ResultCache(**cache_kwargs)
+    if dns_kwargs is not None:
+        from dns_prefilter import DnsPrefilter
+        dns_prefilter = DnsPrefilter(**dns_kwargs)
+    if backend_kwargs is not None:
+        from backends import build_backends
+        backends = build_backends(**backend_kwargs)
+    return DomainChecker(cache=cache, dns_prefilter=dns_prefilter, backends=backends, **checker_kwargs)
+
+
+def shard_for(domain: str, workers: int, shard_by: str = 'server',
+              server_for: Callable[[str], str] = whois_server_for) -> int:
+    """
+    Pick the worker for a domain. 'server' keeps every server (as named by server_for) on exactly one worker,
+    'hash' spreads domains evenly regardless of server.
+    """
+    key = server_for(domain) if shard_by == 'server' else domain
+    return zlib.crc32(key.encode('utf-8')) % workers
+
+
+def split_limits(checker_kwargs: dict, workers: int) -> dict:
+    """
+    Divide per-server rate and concurrency budgets between workers that may all hit the same server.
+    """
+    kwargs = dict(checker_kwargs)
+    if kwargs.get('rate_limit') is not None:
+        kwargs['rate_limit'] = kwargs['rate_limit'] / workers
+    if kwargs.get('max_per_server') is not None:
+        kwargs['max_per_server'] = max(1, math.ceil(kwargs['max_per_server'] / workers))
+    return kwargs
+
+
+def _iter_batches(in_queue) -> Iterator[str]:
+    while True:
+        batch = in_queue.get()
+        if batch is None:
+            return
+        yield from batch
+
+
+def _worker_main(index: int, in_queue, out_queue, checker_kwargs: dict, cache_kwargs: Optional[dict],
+                 dns_kwargs: Optional[dict], backend_kwargs: Optional[dict], window: Optional[int]):
+    checker = build_checker(checker_kwargs, cache_kwargs, dns_kwargs, backend_kwargs)
+    try:
+        batch = []
+        started = 0.0
+        for result in checker.iter_check_domains(_iter_batches(in_queue), window=window, with_stage=True):
+            if not batch:
+                started = time.monotonic()
+            batch.append(result)
+            # Batches keep IPC cheap; the time bound keeps slow shards from holding results back
+            if len(batch) >= BATCH_SIZE or time.monotonic() - started >= FLUSH_INTERVAL:
+                out_queue.put(batch)
+                batch = []
+        if batch:
+            out_queue.put(batch)
+        out_queue.put((_DONE, index, None))
+    except BaseException as e:
+        out_queue.put((_DONE, index, f'{type(e).__name__}: {e}'))
+        raise
+    finally:
+        if checker.cache is not None:
+            checker.cache.close()
+
+
+# Stages whose results a checker stores in its cache (see DomainChecker.cache_result)
+CACHED_STAGES = ('dns', 'whois')
+
+
+def iter_check_sharded(domains: Iterable[str], workers: int, checker_kwargs: dict, cache_kwargs: Optional[dict] = None,
+                       dns_kwargs: Optional[dict] = None, shard_by: str = 'server',
+                       window: Optional[int] = None, backend_kwargs: Optional[dict] = None,
+                       cache=None) -> Iterator[Tuple[str, str, str]]:
+    """
+    Check domains across worker processes, each running its own DomainChecker, and yield
+    (domain, status, stage) from all of them as a single stream for one collector.
+    With cache_kwargs, workers open the cache read-only and this process stores their results,
+    in cache (a ResultCache, e.g. one shared with a FreeVerifier) or in one it opens itself,
+    so SQLite never has several writers waiting on each other's batched transactions.
+    With shard_by='server' no two workers ever query the same server: domains are sharded on the
+    host their route sends them to, so e.g. TLDs sharing one RDAP host share a worker. With 'hash'
+    they may, so each worker gets 1/workers of the per-server rate and concurrency budget.
+    """
+    if shard_by not in ('server', 'hash'):
+        raise ValueError(f"shard_by must be 'server' or 'hash', not {shard_by!r}")
+    import multiprocessing
+    server_for = whois_server_for
+    if shard_by == 'hash':
+        checker_kwargs = split_limits(checker_kwargs, workers)
+    elif backend_kwargs is not None:
+        # The workers' routing, recreated here; it makes no lookups of its own
+        server_for = build_checker(checker_kwargs, backend_kwargs=backend_kwargs).router.server_for
+    owns_cache = cache is None and cache_kwargs is not None
+    if owns_cache:
+        from result_cache import ResultCache
+        cache = ResultCache(**cache_kwargs)  # Opened first, so the schema exists before workers read it
+    if cache_kwargs is not None:
+        cache_kwargs = dict(cache_kwargs, read_only=True)
+    cache_free = checker_kwargs.get('cache_free', True)
+    ctx = multiprocessing.get_context()
+    out_queue = ctx.Queue(maxsize=workers * 16)
+    in_queues = [ctx.Queue(maxsize=16) for _ in range(workers)]
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, in_queues[i], out_queue, checker_kwargs, cache_kwargs, dns_kwargs,
+                                                         backend_kwargs, window),
+                    daemon=True)
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def feed():
+        # Reads the input lazily and hands it out in batches; blocks when a worker falls behind
+        batches = [[] for _ in range(workers)]
+        for domain in domains:
+            i = shard_for(domain, workers, shard_by, server_for)
+            batches[i].append(domain)
+            if len(batches[i]) >= BATCH_SIZE:
+                in_queues[i].put(batches[i])
+                batches[i] = []
+        for i, batch in enumerate(batches):
+            if batch:
+                in_queues[i].put(batch)
+            in_queues[i].put(None)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    running = workers
+    failures = []
+    try:
+        while running:
+            try:
+                message = out_queue.get(timeout=1.0)
+            except queue.Empty:
+                # A worker killed outright (e.g. by the OOM killer) never reports back
+                dead = [i for i, process in enumerate(processes) if process.exitcode not in (None, 0)]
+                if dead:
+                    failures.extend(f'worker {i}: exited with code {processes[i].exitcode}' for i in dead)
+                    break
+                continue
+            if isinstance(message, tuple) and message[0] == _DONE:
+                running -= 1
+                if message[2] is not None:
+                    failures.append(f'worker {message[1]}: {message[2]}')
+                continue
+            for domain, status, stage in message:
+                if cache is not None and stage in CACHED_STAGES and (cache_free or status != 'free'):
+                    cache.put(domain, status)
+                yield domain, status, stage
+    finally:
+        stopped = bool(failures or running)
+        for process in processes:
+            if stopped:
+                process.terminate()
+            process.join()
+        if stopped:
+            # Nobody reads the input queues any more: their pipe writers (and the feeder thread) may be
+            # blocked for good, so interpreter exit must not wait to flush them
+            for in_queue in in_queues:
+                in_queue.cancel_join_thread()
+                in_queue.close()
+        if owns_cache:
+            cache.close()
+    if failures:
+        raise RuntimeError('; '.join(failures))
@@ -0,0 +1,4 @@
+"""
+Unit and integration tests, run from the repository root with: python -m unittest
+Network stages run against local stand-ins (bench.fake_whois, stub DNS and RDAP servers), never real registries.
+"""
@@ -0,0 +1,123 @@
+import http.server
+import os
+import tempfile
+import threading
+import unittest
+
+from backends import RDAP_RATE_LIMITED, RdapBackend, SortedNameFile, ZoneBackend, build_zone_index
+
+ZONE = """$ORIGIN com.
+$TTL 86400
+@ IN SOA a.gtld-servers.net. nstld.verisign-grs.com. 1 2 3 4 5
+example IN NS ns1.example.net.
+        IN NS ns2.example.net.
+Google.com. IN NS ns1.google.com.
+ns1.google IN A 192.0.2.1
+zulu 3600 IN NS ns.zulu.net.
+alpha IN NS ns.alpha.net.
+example IN DS 1 2 3 ABCD
+"""
+
+
+class ZoneIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.zone = os.path.join(self.dir.name, 'com.zone')
+        self.index = os.path.join(self.dir.name, 'com.idx')
+        with open(self.zone, 'w', encoding='ascii') as f:
+            f.write(ZONE)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_build_sorts_and_deduplicates_direct_children(self):
+        # chunk_size=2 forces several sorted runs through the merge
+        self.assertEqual(build_zone_index(self.zone, self.index, 'com', chunk_size=2), 4)
+        with open(self.index, 'rb') as f:
+            self.assertEqual(f.read(), b'alpha.com\nexample.com\ngoogle.com\nzulu.com\n')
+
+    def test_sorted_name_file_lookup(self):
+        build_zone_index(self.zone, self.index, 'com')
+        names = SortedNameFile(self.index)
+        try:
+            for name in ('alpha.com', 'example.com', 'google.com', 'zulu.com'):
+                self.assertIn(name, names)
+            for name in ('aaa.com', 'example.co', 'exampl.com', 'zzz.com', 'ns1.google.com'):
+                self.assertNotIn(name, names)
+        finally:
+            names.close()
+
+    def test_empty_index(self):
+        open(self.index, 'wb').close()
+        names = SortedNameFile(self.index)
+        self.assertNotIn('example.com', names)
+        names.close()
+
+    def test_zone_backend_only_answers_listed_names(self):
+        build_zone_index(self.zone, self.index, 'com')
+        backend = ZoneBackend({'com': self.index})
+        try:
+            self.assertEqual(backend.lookup('EXAMPLE.com'), 'occupied')
+            self.assertIsNone(backend.lookup('unlisted.com'))
+            self.assertIsNone(backend.server_for('example.net'))
+        finally:
+            backend.close()
+
+
+class RdapStub(http.server.BaseHTTPRequestHandler):
+    """
+    Keep-alive RDAP stand-in: registered names contain 'taken', 'slow' names get 429, the rest 404.
+    """
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+    requests = 0
+
+    def do_GET(self):
+        type(self).connections.add(self.client_address)
+        type(self).requests += 1
+        code = 429 if 'slow' in self.path else 200 if 'taken' in self.path else 404
+        body = b'{}'
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/rdap+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RdapBackendTest(unittest.TestCase):
+    def setUp(self):
+        RdapStub.connections, RdapStub.requests = set(), 0
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RdapStub)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.backend = RdapBackend({'com': f'http://127.0.0.1:{self.server.server_port}/rdap'}, bootstrap_url=None)
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_status_codes(self):
+        self.assertEqual(self.backend.lookup('a-taken.com'), 'occupied')
+        self.assertEqual(self.backend.lookup('free-name.com'), 'free')
+        self.assertEqual(self.backend.lookup('slow.com'), RDAP_RATE_LIMITED)
+
+    def test_unknown_tld_is_left_to_next_backend(self):
+        self.assertIsNone(self.backend.lookup('example.zz'))
+        self.assertIsNone(self.backend.server_for('example.zz'))
+        self.assertEqual(self.backend.server_for('example.com'), '127.0.0.1')
+
+    def test_connections_are_reused(self):
+        trace = {}
+        for i in range(20):
+            self.backend.lookup(f'name{i}.com', trace)
+        self.assertEqual(RdapStub.requests, 20)
+        self.assertEqual(len(RdapStub.connections), 1)
+        self.assertEqual(trace['server'], '127.0.0.1')
+        self.assertGreater(trace['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from async_checker import AsyncDomainChecker
+from bench.fake_whois import FakeWhoisServer
+from domain_checker import CheckControl, DomainChecker
+
+
+def expected_status(domain):
+    return 'occupied' if 'taken' in domain else 'free'
+
+
+class FakeWhoisTestCase(unittest.TestCase):
+    latency = 0.005
+    reset_rate = 0.0
+
+    def setUp(self):
+        self.server = FakeWhoisServer(latency=self.latency, reset_rate=self.reset_rate, seed=1).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def make_checker(self, **kwargs):
+        checker = DomainChecker(**dict(dict(max_threads=5, max_retries=10, base_backoff=0.01, jitter=False), **kwargs))
+        checker.client.server, checker.client.port = '127.0.0.1', self.server.port
+        return checker
+
+
+class RetryTest(FakeWhoisTestCase):
+    reset_rate = 0.3
+
+    def test_iter_check_domains_retries_resets(self):
+        domains = [f"d{i}-{'taken' if i % 2 else 'free'}.com" for i in range(20)]
+        results = dict(self.make_checker().iter_check_domains(domains))
+        self.assertEqual(results, {domain: expected_status(domain) for domain in domains})
+        self.assertGreater(self.server.stats['resets'], 0)
+
+    def test_async_checker_retries_resets(self):
+        domains = [f"a{i}-{'taken' if i % 2 else 'free'}.com" for i in range(20)]
+        checker = AsyncDomainChecker(max_concurrency=5, max_retries=10, base_backoff=0.01, jitter=False,
+                                     server='127.0.0.1', port=self.server.port, timeout=5.0)
+
+        async def check_each():
+            return await asyncio.gather(*(checker.check_domain(domain) for domain in domains))
+
+        expected = {domain: expected_status(domain) for domain in domains}
+        self.assertEqual(dict(asyncio.run(check_each())), expected)
+        self.assertEqual(dict(checker.run(domains)), expected)
+        self.assertGreater(self.server.stats['resets'], 0)
+
+
+class ControlTest(FakeWhoisTestCase):
+    latency = 0.02
+
+    def start(self, count):
+        self.control = CheckControl()
+        self.results = []
+        domains = [f'c{i}.com' for i in range(count)]
+        checker = self.make_checker()
+        self.thread = threading.Thread(target=lambda: self.results.extend(
+            checker.iter_check_domains(domains, control=self.control)), daemon=True)
+        self.thread.start()
+
+    def settled_queries(self):
+        # Lookups already in flight when the token changes may still reach the server
+        time.sleep(CheckControl.POLL_INTERVAL + 2 * self.latency + 0.1)
+        return self.server.stats['queries']
+
+    def test_pause_and_resume(self):
+        self.start(100)
+        time.sleep(0.1)
+        self.control.pause()
+        paused = self.settled_queries()
+        time.sleep(0.3)
+        self.assertEqual(self.server.stats['queries'], paused)
+        self.assertLess(len(self.results), 100)
+        self.control.resume()
+        self.thread.join(timeout=10)
+        self.assertFalse(self.thread.is_alive())
+        self.assertEqual(len(self.results), 100)
+
+    def test_cancel(self):
+        self.start(1000)
+        time.sleep(0.1)
+        cancelled = time.monotonic()
+        self.control.cancel()
+        self.thread.join(timeout=2)
+        self.assertFalse(self.thread.is_alive())
+        self.assertLess(time.monotonic() - cancelled, 1.0)
+        stopped = self.settled_queries()
+        time.sleep(0.2)
+        self.assertEqual(self.server.stats['queries'], stopped)
+        self.assertLess(len(self.results), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import socket
+import struct
+import threading
+import time
+import unittest
+
+from dns_prefilter import DNS_RCODE_NXDOMAIN, DnsPrefilter, build_query, parse_response
+from domain_checker import CheckControl
+
+
+class StubResolver:
+    """
+    UDP DNS stand-in: names containing 'taken' get one NS answer, 'silent' ones no reply, the rest NXDOMAIN.
+    queries counts the packets received.
+    """
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self.queries = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(512)
+            except socket.timeout:
+                continue
+            self.queries += 1
+            if b'silent' in data:
+                continue
+            if b'taken' in data:
+                flags, answers = 0x8180, 1
+            else:
+                flags, answers = 0x8180 | DNS_RCODE_NXDOMAIN, 0
+            self.sock.sendto(data[:2] + struct.pack('!HHHHH', flags, 1, answers, 0, 0) + data[12:], address)
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+class PacketTest(unittest.TestCase):
+    def test_query_round_trip(self):
+        packet = build_query(4660, 'example.com')
+        self.assertIn(b'\x07example\x03com\x00', packet)
+        self.assertEqual(parse_response(packet), (4660, 0, 0, False))
+
+
+class DnsPrefilterTest(unittest.TestCase):
+    def setUp(self):
+        self.resolver = StubResolver()
+        self.prefilter = DnsPrefilter('127.0.0.1', self.resolver.port, timeout=0.2, retries=0, max_concurrency=20)
+
+    def tearDown(self):
+        self.resolver.close()
+
+    def test_delegated_names_are_occupied(self):
+        results = dict(self.prefilter.run(['a-taken.com', 'free.com', 'silent.com']))
+        self.assertEqual(results, {'a-taken.com': True, 'free.com': False, 'silent.com': False})
+
+    def test_iter_filter_passes_decided_items_through(self):
+        items = [('a-taken.com', None, None), ('cached.com', 'free', 'cache'), ('free.com', None, None)]
+        results = {item[0]: item[1:] for item in self.prefilter.iter_filter(items) if item is not None}
+        self.assertEqual(results, {'a-taken.com': ('occupied', 'dns'), 'cached.com': ('free', 'cache'),
+                                   'free.com': (None, None)})
+
+    def test_cancel_stops_queries(self):
+        control = CheckControl()
+        items = ((f'name{i}.com', None, None) for i in range(50_000))
+        seen = 0
+        for item in self.prefilter.iter_filter(items, window=100, control=control):
+            if item is not None:
+                seen += 1
+            if seen == 200:
+                control.cancel()
+        stopped = self.resolver.queries
+        time.sleep(0.3)
+        self.assertLess(stopped, 1000)
+        self.assertEqual(self.resolver.queries, stopped)
+
+    def test_consumer_leaving_stops_queries(self):
+        items = ((f'name{i}.com', None, None) for i in range(50_000))
+        results = self.prefilter.iter_filter(items, window=100)
+        for seen, item in enumerate(results):
+            if seen == 200:
+                break
+        results.close()
+        time.sleep(0.3)
+        settled = self.resolver.queries
+        time.sleep(0.3)
+        self.assertLess(settled, 1000)
+        self.assertEqual(self.resolver.queries, settled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from domain_input import BloomFilter, DomainNormalizer, normalize_domain
+
+
+class NormalizeDomainTest(unittest.TestCase):
+    def test_canonical_forms(self):
+        cases = {
+            'Example.COM': 'example.com',
+            '  example.com.  ': 'example.com',
+            'https://user:pw@Example.com:8080/path?q=1': 'example.com',
+            'example.com/index.html': 'example.com',
+            'münchen.de': 'xn--mnchen-3ya.de',
+            'sub.example.co.uk': 'sub.example.co.uk',
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(normalize_domain(line), expected)
+
+    def test_invalid_lines(self):
+        for line in ('', 'localhost', '-bad.com', 'bad-.com', 'exa mple.com', 'example.123', 'a' * 64 + '.com'):
+            with self.subTest(line=line):
+                self.assertIsNone(normalize_domain(line))
+
+
+class DomainNormalizerTest(unittest.TestCase):
+    def test_drops_duplicates_blanks_and_invalid_lines(self):
+        normalizer = DomainNormalizer()
+        lines = ['a.com', 'A.com.', '', 'not a domain', 'b.com', 'http://a.com/']
+        self.assertEqual(list(normalizer.iter_domains(lines)), ['a.com', 'b.com'])
+        self.assertEqual(normalizer.stats, {'accepted': 2, 'duplicate': 2, 'blank': 1, 'invalid': 1})
+
+    def test_no_dedupe(self):
+        self.assertEqual(list(DomainNormalizer(dedupe=False).iter_domains(['a.com', 'a.com'])), ['a.com', 'a.com'])
+
+    def test_exact_limit_switches_to_bloom_filter(self):
+        normalizer = DomainNormalizer(exact_limit=100, bloom_capacity=10_000)
+        lines = [f'd{i % 300}.com' for i in range(900)]
+        self.assertEqual(len(list(normalizer.iter_domains(lines))), 300)
+        self.assertIsInstance(normalizer.seen, BloomFilter)
+        self.assertEqual(normalizer.stats['duplicate'], 600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import socket
+import unittest
+
+from domain_checker import (UNCONFIRMED_FREE, WHOIS_RATE_LIMITED, WHOIS_REFER_RE, ErrorKind, UnknownTldError,
+                            classify_exception, classify_partial, confirm_whois_response, error_kind, error_status,
+                            is_error, parse_whois_response)
+
+REGISTERED = (
+    "   Domain Name: EXAMPLE.COM\r\n"
+    "   Registry Domain ID: 2336799_DOMAIN_COM-VRSN\r\n"
+    "   Registrar WHOIS Server: whois.iana.org\r\n"
+)
+NOT_FOUND_COM = 'No match for "FREE-NAME.COM".\r\n>>> Last update of whois database: 2024-01-01 <<<\r\n'
+
+
+class ClassifyPartialTest(unittest.TestCase):
+    def test_registered(self):
+        self.assertEqual(classify_partial(REGISTERED), 'occupied')
+
+    def test_not_found(self):
+        self.assertEqual(classify_partial(NOT_FOUND_COM), 'free')
+
+    def test_rate_limited(self):
+        self.assertEqual(classify_partial('%% Query limit exceeded, try again later'), WHOIS_RATE_LIMITED)
+
+    def test_undecided_prefix_needs_more(self):
+        self.assertIsNone(classify_partial('% WHOIS server\r\n   Domain Name: EXAMPLE.COM\r\n'))
+        self.assertEqual(parse_whois_response('% WHOIS server\r\n   Domain Name: EXAMPLE.COM\r\n'), 'occupied')
+
+
+class ConfirmWhoisResponseTest(unittest.TestCase):
+    def test_registry_not_found_wording_confirms_free(self):
+        self.assertEqual(confirm_whois_response(NOT_FOUND_COM, 'com'), 'free')
+
+    def test_loose_not_found_is_not_enough_for_known_tld(self):
+        self.assertEqual(confirm_whois_response('Error: object not found in backend cache', 'com'), UNCONFIRMED_FREE)
+
+    def test_registration_wins(self):
+        self.assertEqual(confirm_whois_response(REGISTERED, 'com'), 'occupied')
+
+    def test_rate_limit(self):
+        self.assertEqual(confirm_whois_response('Too many queries, try again later', 'com'), WHOIS_RATE_LIMITED)
+
+    def test_unlisted_tld_uses_general_pattern(self):
+        self.assertEqual(confirm_whois_response('Domain not found.', 'zz'), 'free')
+
+
+class ErrorKindTest(unittest.TestCase):
+    def test_structured_statuses(self):
+        for kind in ErrorKind:
+            with self.subTest(kind=kind):
+                self.assertIs(error_kind(error_status(kind, 'message')), kind)
+
+    def test_results_are_not_errors(self):
+        for status in ('free', 'occupied', 'Pending', 'Cancelled'):
+            self.assertIsNone(error_kind(status))
+            self.assertFalse(is_error(status))
+
+    def test_legacy_statuses(self):
+        self.assertIs(error_kind('error 54: Connection reset by peer'), ErrorKind.RESET)
+        self.assertIs(error_kind('error: timed out'), ErrorKind.TIMEOUT)
+        self.assertIs(error_kind('error: rate limit hit'), ErrorKind.RATE_LIMITED)
+        self.assertIs(error_kind('error: something odd'), ErrorKind.OTHER)
+
+    def test_classify_exception(self):
+        self.assertIs(classify_exception(socket.timeout()), ErrorKind.TIMEOUT)
+        self.assertIs(classify_exception(ConnectionResetError(54, 'reset')), ErrorKind.RESET)
+        self.assertIs(classify_exception(socket.gaierror(socket.EAI_NONAME, 'unknown name')), ErrorKind.NETWORK)
+        self.assertIs(classify_exception(UnknownTldError('no server')), ErrorKind.UNKNOWN_TLD)
+        self.assertIs(classify_exception(KeyError('bug')), ErrorKind.OTHER)
+        self.assertIs(classify_exception(UnicodeError()), ErrorKind.PARSE)
+
+
+class ReferralTest(unittest.TestCase):
+    def test_refer_field(self):
+        self.assertEqual(WHOIS_REFER_RE.search('domain: IO\n\nrefer:        whois.nic.io\n').group(2), 'whois.nic.io')
+
+    def test_empty_field_does_not_take_next_line(self):
+        self.assertIsNone(WHOIS_REFER_RE.search('whois:        \n\nstatus: ACTIVE\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Tuple
+
+from domain_checker import DomainChecker, LookupBackend, UNCONFIRMED_FREE, error_kind, exception_status
+
+# Stages whose free results are re-checked. Cached frees were verified before they were stored:
+# the bulk pass does not cache frees while a verifier is attached (DomainChecker.cache_free)
+VERIFIED_STAGES = ('whois',)
+
+
+class FreeVerifier:
+    """
+    Second pass over the free results of a check. Each one is looked up again delay seconds later,
+    through another backend of its route when there is one (RDAP results are re-checked over WHOIS),
+    by at most max_concurrency threads, and WHOIS replies must match the TLD's exact not-found
+    pattern (see confirm_whois_response). The bulk pass can then run aggressively while the
+    small free set is checked slowly and strictly.
+    Attaching a verifier turns off caching of the checker's unverified frees; checkers in other
+    processes (see sharded.iter_check_sharded) need cache_free=False in their settings.
+    """
+    def __init__(self, checker: DomainChecker, delay: float = 30.0, max_concurrency: int = 2):
+        self.checker = checker
+        checker.cache_free = False
+        self.delay = delay
+        self.max_concurrency = max_concurrency
+
+    def backend_for(self, domain: str) -> LookupBackend:
+        remote = self.checker.router.chain(domain)[1]
+        return remote[1] if len(remote) > 1 else remote[0]
+
+    def verify(self, domain: str) -> Tuple[str, List[tuple]]:
+        """
+        Re-check one free domain, retrying like the bulk pass. Returns its final status and the
+        observe_lookup arguments of each attempt, for the consuming thread to report.
+        """
+        backend = self.backend_for(domain)
+        events = []
+        for attempt in range(self.checker.max_retries):
+            trace = {} if self.checker.observer is not None else None
+            started = time.monotonic()
+            try:
+                status = backend.confirm_free(domain, trace) or UNCONFIRMED_FREE
+            except Exception as e:
+                status = exception_status(e)
+            retryable = error_kind(status) in self.checker.retry_kinds
+            last = not retryable or attempt == self.checker.max_retries - 1
+            delay = 0.0 if last else self.checker.backoff_delay(attempt)
+            events.append((domain, backend.server_for(domain), attempt + 1, status, retryable,
+                           time.monotonic() - started, trace, delay))
+            if last:
+                break
+            time.sleep(delay)
+        return status, events
+
+    def worker(self, work: queue.Queue, done: queue.Queue):
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            due, domain = item
+            time.sleep(max(0.0, due - time.monotonic()))  # Items share one delay, so they come due in order
+            try:
+                status, events = self.verify(domain)
+            except Exception as e:
+                status, events = exception_status(e), []
+            done.put((domain, status, events))
+
+    def iter_verified(self, results: Iterable[Tuple[str, str, str]]) -> Iterator[Tuple[str, str, str]]:
+        """
+        Pass (domain, status, stage) results through, holding back the free ones from VERIFIED_STAGES
+        until they are re-checked; those come out with stage 'verify' and their confirmed status,
+        which is also written to the checker's cache.
+        """
+        work, done = queue.Queue(), queue.Queue()
+        threads = [threading.Thread(target=self.worker, args=(work, done), daemon=True)
+                   for _ in range(self.max_concurrency)]
+        for thread in threads:
+            thread.start()
+        pending = 0
+
+        def finished(domain, status, events):
+            for event in events:
+                self.checker.observe_lookup(*event)
+            if self.checker.cache is not None:
+                self.checker.cache.put(domain, status)
+            return domain, status, 'verify'
+
+        try:
+            for domain, status, stage in results:
+                if status == 'free' and stage in VERIFIED_STAGES:
+                    work.put((time.monotonic() + self.delay, domain))
+                    pending += 1
+                else:
+                    yield domain, status, stage
+                while pending:
+                    try:
+                        item = done.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending -= 1
+                    yield finished(*item)
+            while pending:
+                pending -= 1
+                yield finished(*done.get())
+        finally:
+            while True:
+                try:
+                    work.get_nowait()  # The consumer stopped early: drop checks that have not started
+                except queue.Empty:
+                    break
+            for _ in threads:
+                work.put(None)  # Workers finish their current domain and exit; they are not awaited